@@ -1,22 +1,63 @@
-from modules.embedding import embed_driving_rules
-from modules.llm_setup import setup_llm
+import argparse
+import time
+
+from modules.batch import BATCH_N_RESULTS, BATCH_WORKERS, run_batch
+from modules.embedding import load_driving_rules
+from modules.llm_setup import ANSWER_MAX_TOKENS, setup_llm
 from modules.query_system import interactive_query
 
+def rebuild_index():
+    print("Rebuilding the driving rules index...")
+    started = time.perf_counter()
+    client, collection, _ = load_driving_rules(rebuild=True)
+    print(f"Indexed {collection.count()} chunks into '{collection.name}' in {time.perf_counter() - started:.1f} s")
+    return client, collection
+
 def main():
+    parser = argparse.ArgumentParser(description="Lithuanian traffic rules assistant.")
+    parser.add_argument("command", nargs="?", choices=["chat", "rebuild-index", "batch"], default="chat",
+                        help="chat (default) answers questions from the prebuilt index; "
+                             "rebuild-index re-chunks and re-embeds data/source.txt; "
+                             "batch answers a JSONL or CSV question file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print per-stage timings for every question")
+    parser.add_argument("--no-stream", action="store_true", help="print answers only once they are complete")
+    parser.add_argument("--max-tokens", type=int, default=ANSWER_MAX_TOKENS,
+                        help=f"stop streamed answers after this many tokens (default {ANSWER_MAX_TOKENS})")
+    parser.add_argument("--input", help="batch: JSONL or CSV file of questions")
+    parser.add_argument("--output", default="-", help="batch: JSONL file for the answers (default stdout)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS,
+                        help=f"batch: concurrent answer requests (default {BATCH_WORKERS})")
+    parser.add_argument("--n-results", type=int, default=BATCH_N_RESULTS,
+                        help=f"batch: rule chunks retrieved per question (default {BATCH_N_RESULTS})")
+    args = parser.parse_args()
+
+    if args.command == "rebuild-index":
+        return rebuild_index()
+
+    if args.command == "batch":
+        if not args.input:
+            parser.error("batch needs --input")
+        setup_llm()
+        _, collection, _ = load_driving_rules()
+        return run_batch(args.input, args.output, collection, args.workers, args.n_results)
+
+    started = time.perf_counter()
     print("Starting driving bot setup...")
-    
+
     print("Setting up LLM...")
     setup_llm()
-    
-    print("Embedding driving rules into ChromaDB...")
-    client, collection = embed_driving_rules()
-    
-    print("Driving rules successfully embedded into ChromaDB!")
-    print(f"Collection name: {collection.name}")
-    
+
+    print("Loading driving rules index...")
+    client, collection, rebuilt = load_driving_rules()
+
+    if rebuilt:
+        print("Index was missing or out of date; driving rules embedded into ChromaDB.")
+    print(f"Collection name: {collection.name} ({collection.count()} chunks)")
+    print(f"Ready in {time.perf_counter() - started:.2f} s")
+
     print("\nStarting interactive query system...")
-    interactive_query(collection)
-    
+    interactive_query(collection, args.verbose, not args.no_stream, args.max_tokens)
+
     return client, collection
 
 if __name__ == "__main__":
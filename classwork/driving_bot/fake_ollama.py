@@ -0,0 +1,114 @@
+"""
+Minimal local fake of the Ollama HTTP API for the driving bot tests.
+
+Serves /api/generate, /api/embed, /api/embeddings and /api/tags over keep-alive
+HTTP/1.1. Behaviour is scripted per server: `failures` is a list of status
+codes returned (in order) before requests start succeeding, `delay` is
+slept before every answer, and every request path and body is recorded
+together with the number of TCP connections accepted. Streamed generate
+requests get `response` word by word as NDJSON, one word every
+`token_interval` seconds, up to options.num_predict words; `cancelled`
+counts streams the client closed before the end.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, request):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = self.server.response.split(" ")
+        limit = request.get("options", {}).get("num_predict") or len(words)
+        pieces = [word if i == 0 else " " + word for i, word in enumerate(words[:limit])]
+        chunks = [{"response": piece, "done": False} for piece in pieces] + [{"response": "", "done": True}]
+        try:
+            for chunk in chunks:
+                body = (json.dumps(chunk) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(body):x}\r\n".encode("ascii") + body + b"\r\n")
+                self.wfile.flush()
+                time.sleep(self.server.token_interval)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            with self.server.lock:
+                self.server.cancelled += 1
+            self.close_connection = True
+
+    def _handle(self, request):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, request))
+            status = server.failures.pop(0) if server.failures else None
+        time.sleep(server.delay)
+        if status is not None:
+            self._send_json({"error": "scripted failure"}, status=status)
+        elif self.path == "/api/generate" and request.get("stream", True):
+            self._send_stream(request)
+        elif self.path == "/api/generate":
+            self._send_json({"model": request.get("model", ""), "response": server.response, "done": True})
+        elif self.path == "/api/embeddings":
+            self._send_json({"embedding": [float(len(request.get("prompt", ""))), 1.0, 0.0]})
+        elif self.path == "/api/embed":
+            inputs = request.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({"embeddings": [[float(len(text)), 1.0, 0.0] for text in inputs]})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": name} for name in server.models]})
+        else:
+            self._send_json({"error": f"unknown path {self.path}"}, status=404)
+
+    def do_GET(self):
+        self._handle({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self._handle(json.loads(self.rfile.read(length) or b"{}"))
+
+
+def start_fake_ollama(response: str = "YES", delay: float = 0.0, failures=None, models=("gemma3:latest",),
+                      token_interval: float = 0.0):
+    """
+    Start the fake server on a background thread.
+
+    Returns:
+        Tuple of (server, base_url). The server exposes requests, connections,
+        failures, delay and response for inspection and scripting; call
+        server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.connections = 0
+    server.failures = list(failures or [])
+    server.delay = delay
+    server.response = response
+    server.models = list(models)
+    server.token_interval = token_interval
+    server.cancelled = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
@@ -0,0 +1,147 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .embedding import get_embeddings, query_many
+from .llm_setup import get_structured_answer, validate_driving_question
+from .relevance import relevance_gate
+
+BATCH_WORKERS = 4
+BATCH_N_RESULTS = 2
+_NO_ANSWER = {"answer": None, "rule_reference": None, "confidence": None}
+
+
+def read_questions(path: str):
+    """
+    Read a question set.
+
+    JSONL files have one object per line with a "question" and an optional
+    "id"; CSV files need a "question" column and may have an "id" column.
+    Items without an id are numbered from 1.
+
+    Returns:
+        List of {"id", "question"} dicts in file order.
+    """
+    with open(path, encoding="utf-8", newline="") as file:
+        if os.path.splitext(path)[1].lower() == ".csv":
+            rows = list(csv.DictReader(file))
+        else:
+            rows = [json.loads(line) for line in file if line.strip()]
+    items = []
+    for number, row in enumerate(rows, 1):
+        question = (row.get("question") or "").strip()
+        if question:
+            items.append({"id": row.get("id") or str(number), "question": question})
+    return items
+
+
+def _answer(item, documents, queued_at):
+    latency = {"queue": time.perf_counter() - queued_at}
+    if item["relevant"] is None:
+        started = time.perf_counter()
+        item["relevant"] = validate_driving_question(item["question"])
+        latency["validation"] = time.perf_counter() - started
+    response, parsed = None, None
+    if item["relevant"] and documents:
+        started = time.perf_counter()
+        response, parsed = get_structured_answer(item["question"], documents, item["rule_ids"])
+        latency["answer"] = time.perf_counter() - started
+    latency["total"] = time.perf_counter() - queued_at
+    return {
+        **item,
+        **(response.model_dump() if response is not None else _NO_ANSWER),
+        "parsed": parsed,
+        "latency": {stage: round(seconds, 4) for stage, seconds in latency.items()},
+    }
+
+
+def answer_batch(items, collection, workers: int = BATCH_WORKERS, n_results: int = BATCH_N_RESULTS):
+    """
+    Answer a list of questions from read_questions.
+
+    All questions are embedded together (cached vectors plus batched
+    /api/embed calls), relevance_gate's cheap tiers run on each, and the
+    questions are retrieved with a single multi-query collection.query.
+    Answers (and LLM validations for the gate's ambiguous band) are then
+    generated on a pool of `workers` threads sharing the pooled Ollama
+    client.
+
+    Yields:
+        One result per item, in input order: id, question, relevant, gate
+        tier, rule_ids, distances, the DrivingResponse fields answer,
+        rule_reference and confidence (None if off topic or failed), how
+        the model output was parsed, and per-item latency (queue,
+        validation, answer, total). The batch-wide stage timings are in
+        the returned summary.
+
+    Returns:
+        Summary dict with the item count, batch stage timings and throughput.
+    """
+    started = time.perf_counter()
+    timings = {}
+
+    stage_started = time.perf_counter()
+    embeddings = [response.embedding for response in get_embeddings([item["question"] for item in items])]
+    timings["embedding"] = time.perf_counter() - stage_started
+
+    stage_started = time.perf_counter()
+    gated = []
+    for item, embedding in zip(items, embeddings):
+        relevant, tier = relevance_gate.check(item["question"], embedding, collection)
+        gated.append({**item, "relevant": relevant, "gate": tier})
+    timings["gate"] = time.perf_counter() - stage_started
+
+    stage_started = time.perf_counter()
+    results = query_many(embeddings, collection, n_results) if items else {"ids": [], "documents": [], "distances": []}
+    timings["retrieval"] = time.perf_counter() - stage_started
+
+    stage_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        futures = []
+        for i, item in enumerate(gated):
+            item["rule_ids"] = results["ids"][i]
+            item["distances"] = [round(distance, 4) for distance in results["distances"][i]]
+            if item["relevant"] is False:
+                futures.append(None)
+                continue
+            futures.append(executor.submit(_answer, item, results["documents"][i], time.perf_counter()))
+        for item, future in zip(gated, futures):
+            if future is None:
+                yield {**item, **_NO_ANSWER, "parsed": None, "latency": {"total": 0.0}}
+            else:
+                yield future.result()
+    timings["answering"] = time.perf_counter() - stage_started
+
+    seconds = time.perf_counter() - started
+    return {
+        "items": len(items),
+        "workers": workers,
+        "stage_timings": {stage: round(value, 4) for stage, value in timings.items()},
+        "seconds": round(seconds, 4),
+        "questions_per_second": round(len(items) / seconds, 2) if seconds else 0.0,
+    }
+
+
+def run_batch(input_path: str, output_path: str, collection, workers: int = BATCH_WORKERS,
+              n_results: int = BATCH_N_RESULTS):
+    """Answer the questions in input_path and write the results as JSONL to output_path ("-" for stdout)."""
+    items = read_questions(input_path)
+    print(f"Answering {len(items)} questions with {workers} workers...", file=sys.stderr)
+    output = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    results = answer_batch(items, collection, workers, n_results)
+    try:
+        while True:
+            try:
+                result = next(results)
+            except StopIteration as stop:
+                summary = stop.value
+                break
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Done: {json.dumps(summary)}", file=sys.stderr)
+    return summary
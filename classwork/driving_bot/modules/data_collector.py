@@ -1,18 +1,14 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+from .chunking import get_chunks_of_text as _get_chunks_of_text
 
+SOURCE_FILE = "data/source.txt"
+CHUNK_SIZE = 750
+CHUNK_OVERLAP = 100
 
-def read_source_file(file_path: str = "data/source.txt") -> str:
+
+def read_source_file(file_path: str = SOURCE_FILE) -> str:
     with open(file_path, 'r', encoding='utf-8') as file:
         return file.read()
 
 
 def get_chunks_of_text(text: str):
-    document = Document(page_content=text)
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=750,
-        chunk_overlap=100
-    )
-
-    chunks = splitter.split_documents(documents=[document])
-    return chunks
+    return _get_chunks_of_text(text, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
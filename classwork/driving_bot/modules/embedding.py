@@ -1,26 +1,59 @@
-from ollama import embeddings
+import hashlib
+from ollama import EmbeddingsResponse
 import chromadb
-from .data_collector import read_source_file, get_chunks_of_text
+from .data_collector import CHUNK_OVERLAP, CHUNK_SIZE, SOURCE_FILE, read_source_file, get_chunks_of_text
+from .embedding_cache import get_embedding_cache
+from .ollama_client import ollama_client
+
+EMBEDDING_MODEL = 'nomic-embed-text'
+# Vectors come from the batched /api/embed endpoint, which normalizes them
+# (the legacy /api/embeddings does not); cached vectors and the index
+# fingerprint are keyed by this so that the two kinds are never mixed.
+EMBEDDING_KEY = f"{EMBEDDING_MODEL}/api/embed"
+# Texts sent to Ollama per /api/embed request.
+EMBED_BATCH_SIZE = 256
+COLLECTION_NAME = "driving_rules"
+INDEX_FINGERPRINT_KEY = "index_fingerprint"
 
 
 def get_embedding(text):
-    return embeddings(model='nomic-embed-text', prompt=text)
+    return get_embeddings([text])[0]
 
 
 def get_embeddings(text_list):
-    result = []
-    for text in text_list:
-        result.append(get_embedding(text))
-    return result
+    """Embed texts, taking cached vectors from the embedding cache and the rest in batched /api/embed calls."""
+    embedding_cache = get_embedding_cache()
+    vectors = embedding_cache.get_many(EMBEDDING_KEY, text_list)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    for start in range(0, len(missing), EMBED_BATCH_SIZE):
+        indexes = missing[start:start + EMBED_BATCH_SIZE]
+        texts = [text_list[i] for i in indexes]
+        computed = ollama_client.embed(EMBEDDING_MODEL, texts)
+        embedding_cache.put_many(EMBEDDING_KEY, texts, computed)
+        for i, vector in zip(indexes, computed):
+            vectors[i] = vector
+    return [EmbeddingsResponse(embedding=vector) for vector in vectors]
 
 
 def init_chroma():
     client = chromadb.PersistentClient(path="./vector-db")
-    collection = client.get_or_create_collection("driving_rules")
+    collection = client.get_or_create_collection(COLLECTION_NAME)
     return (client, collection)
 
 
+def get_index_fingerprint(file_path: str = SOURCE_FILE) -> str:
+    """
+    Fingerprint of everything the stored index depends on: the source file
+    contents, the chunker parameters and the embedding model and endpoint.
+    """
+    with open(file_path, 'rb') as file:
+        source_hash = hashlib.sha256(file.read()).hexdigest()
+    parts = [source_hash, str(CHUNK_SIZE), str(CHUNK_OVERLAP), EMBEDDING_KEY]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
 def embed_driving_rules():
+    """Build the index from scratch: re-chunk and re-embed the source and replace the collection."""
     text = read_source_file()
     chunks = get_chunks_of_text(text)
     chunks_text = [chunk.page_content for chunk in chunks]
@@ -28,20 +61,51 @@ def embed_driving_rules():
     (chroma_client, chroma_collection) = init_chroma()
     embedding_collection = get_embeddings(chunks_text)
     
-    for i in range(0, len(embedding_collection)):
-        chroma_collection.upsert(
-            documents=chunks_text[i],
-            ids=[f"rule-{i+1}"],
-            embeddings=[embedding_collection[i].embedding]
-        )
+    chroma_client.delete_collection(COLLECTION_NAME)
+    chroma_collection = chroma_client.create_collection(COLLECTION_NAME)
+    chroma_collection.upsert(
+        documents=chunks_text,
+        ids=[f"rule-{i+1}" for i in range(len(chunks_text))],
+        embeddings=[embedding.embedding for embedding in embedding_collection]
+    )
+    chroma_collection.modify(metadata={INDEX_FINGERPRINT_KEY: get_index_fingerprint()})
     
     return (chroma_client, chroma_collection)
 
 
+def load_driving_rules(rebuild: bool = False):
+    """
+    Open the prebuilt index, building it only when it is missing or stale.
+
+    The index is reused as long as the fingerprint stored in the collection
+    metadata matches get_index_fingerprint(), so a normal start neither
+    chunks the source nor calls the embedding model.
+
+    Returns:
+        Tuple of (chroma client, collection, whether the index was rebuilt).
+    """
+    (chroma_client, chroma_collection) = init_chroma()
+    stored = (chroma_collection.metadata or {}).get(INDEX_FINGERPRINT_KEY)
+    if not rebuild and stored == get_index_fingerprint() and chroma_collection.count() > 0:
+        return (chroma_client, chroma_collection, False)
+    (chroma_client, chroma_collection) = embed_driving_rules()
+    return (chroma_client, chroma_collection, True)
+
+
 def query(input: str, collection: chromadb.Collection):
-    embedded_query = get_embedding(input)
-    result = collection.query(
-        query_embeddings=[embedded_query.embedding], 
-        n_results=2
+    return query_by_embedding(get_embedding(input).embedding, collection)
+
+
+def query_by_embedding(embedding, collection: chromadb.Collection, n_results: int = 2):
+    return collection.query(
+        query_embeddings=[embedding],
+        n_results=n_results
+    )
+
+
+def query_many(embeddings, collection: chromadb.Collection, n_results: int = 2):
+    """One Chroma query for many question embeddings; result lists are in the order of embeddings."""
+    return collection.query(
+        query_embeddings=embeddings,
+        n_results=n_results
     )
-    return result 
\ No newline at end of file
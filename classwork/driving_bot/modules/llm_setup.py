@@ -1,16 +1,46 @@
+import json
+import re
 import subprocess
-import requests
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, ValidationError
+from .ollama_client import CONNECT_TIMEOUT, OllamaError, ollama_client
+
+# Seconds a validation may take, retries included; on timeout the question is accepted.
+VALIDATION_DEADLINE = 10
+# Seconds an answer may take before the question is given up on.
+ANSWER_DEADLINE = 180
+# Tokens after which a streamed answer is cut off.
+ANSWER_MAX_TOKENS = 512
 
 
 class DrivingResponse(BaseModel):
     answer: str
     rule_reference: str
-    confidence: float
+    confidence: float = Field(ge=0.0, le=1.0)
+
+
+# JSON schema the model's output is constrained to (Ollama's `format`).
+# rule_reference is left out: it is filled from the ids of the retrieved
+# chunks instead of being generated.
+GENERATED_SCHEMA = DrivingResponse.model_json_schema()
+GENERATED_SCHEMA["properties"].pop("rule_reference")
+GENERATED_SCHEMA["required"] = ["answer", "confidence"]
+
+JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def is_model_available(model_name: str) -> bool:
+    """Whether the local Ollama server already has model_name (any tag, e.g. gemma3 matches gemma3:latest)."""
+    try:
+        names = ollama_client.model_names()
+    except OllamaError:
+        return False
+    return model_name in names or any(name.split(":")[0] == model_name for name in names)
 
 
 def setup_llm():
     model_name = "gemma3"
+    if is_model_available(model_name):
+        return model_name
     print(f"Pulling {model_name} model from Ollama...")
     subprocess.run(["ollama", "pull", model_name], check=True)
     return model_name
@@ -51,32 +81,16 @@ def validate_driving_question(question: str) -> bool:
     Be strict - only answer "YES" if the question clearly relates to Lithuanian traffic rules or driving regulations."""
     
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": model_name,
-                "prompt": validation_prompt,
-                "stream": False
-            },
-            timeout=10
-        )
-        
-        if not response.ok:
-            print(f"Validation error: {response.status_code}")
-            return True  # Default to accepting if validation fails
-        
-        result = response.json()["response"].strip().upper()
-        return result == "YES"
+        result = ollama_client.generate(model_name, validation_prompt, deadline=VALIDATION_DEADLINE)
+        return result.strip().upper() == "YES"
         
     except Exception as e:
         print(f"Validation error: {e}")
         return True  # Default to accepting if validation fails
 
 
-def get_driving_answer(question: str, context: str):
-    model_name = "gemma3"
-    
-    prompt = f"""You are a helpful assistant that answers questions about Lithuanian traffic rules. 
+def build_answer_prompt(question: str, context: str) -> str:
+    return f"""You are a helpful assistant that answers questions about Lithuanian traffic rules. 
     Use the following context to answer the question accurately and concisely.
     
     Context: {context}
@@ -85,17 +99,116 @@ def get_driving_answer(question: str, context: str):
     
     Please provide a clear answer based on the Lithuanian traffic rules provided in the context."""
 
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={
-            "model": model_name,
-            "prompt": prompt,
-            "stream": False
-        }
-    )
-
-    if not response.ok:
-        print("Error:", response.status_code)
+
+def get_driving_answer(question: str, context: str):
+    model_name = "gemma3"
+    prompt = build_answer_prompt(question, context)
+
+    try:
+        return ollama_client.generate(model_name, prompt, timeout=(CONNECT_TIMEOUT, ANSWER_DEADLINE),
+                                      deadline=ANSWER_DEADLINE)
+    except OllamaError as e:
+        print("Error:", e)
         return None
+
+
+def stream_driving_answer(question: str, context: str, max_tokens: int = ANSWER_MAX_TOKENS):
+    """
+    Generate the answer as a stream of text pieces (one per Ollama token).
+
+    Generation stops after max_tokens tokens: Ollama is asked for at most
+    that many (num_predict) and the stream is closed once they have
+    arrived. Closing the generator early (e.g. on Ctrl-C) closes the
+    connection, which stops generation on the server.
+
+    Raises:
+        OllamaError: The request failed or the stream broke off.
+    """
+    model_name = "gemma3"
+    prompt = build_answer_prompt(question, context)
+    options = {"options": {"num_predict": max_tokens}} if max_tokens else {}
+
+    chunks = ollama_client.generate_stream(model_name, prompt, deadline=ANSWER_DEADLINE, **options)
+    try:
+        for count, chunk in enumerate(chunks, 1):
+            if chunk.get("response"):
+                yield chunk["response"]
+            if max_tokens and count >= max_tokens:
+                return
+    finally:
+        chunks.close()
+
+
+def build_structured_prompt(question: str, documents, rule_ids) -> str:
+    context = "\n\n".join(f"[{rule_id}] {document}" for rule_id, document in zip(rule_ids, documents))
+    return f"""You are a helpful assistant that answers questions about Lithuanian traffic rules. 
+    Use the following rules to answer the question accurately and concisely.
+    
+    Rules:
+    {context}
     
-    return response.json()["response"] 
\ No newline at end of file
+    Question: {question}
+    
+    Reply with a JSON object: "answer" is your answer based on the rules above, and "confidence" is a
+    number from 0 to 1 saying how well the rules support it."""
+
+
+def parse_driving_response(text: str, rule_reference: str):
+    """
+    Turn the model output into a DrivingResponse without asking the model again.
+
+    Schema-constrained output validates directly. Otherwise the first
+    {...} block is extracted (dropping code fences or surrounding prose) and
+    confidence is coerced into [0, 1] ("0.8", "80%" and 80 all become 0.8);
+    as a last resort the whole text is taken as the answer with confidence 0.
+
+    Returns:
+        Tuple of (DrivingResponse, how it was parsed: "json", "repaired" or "text").
+    """
+    try:
+        data = json.loads(text)
+        return DrivingResponse(rule_reference=rule_reference, **data), "json"
+    except (ValueError, TypeError, ValidationError):
+        pass
+
+    match = JSON_OBJECT_PATTERN.search(text)
+    try:
+        data = json.loads(match.group(0)) if match else None
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and isinstance(data.get("answer"), str) and data["answer"].strip():
+        confidence = str(data.get("confidence", 0.0)).strip()
+        try:
+            value = float(confidence.rstrip("%"))
+        except ValueError:
+            value = 0.0
+        if confidence.endswith("%") or value > 10:
+            value /= 100.0
+        confidence = min(max(value, 0.0), 1.0)
+        response = DrivingResponse(answer=data["answer"].strip(), rule_reference=rule_reference, confidence=confidence)
+        return response, "repaired"
+
+    return DrivingResponse(answer=text.strip(), rule_reference=rule_reference, confidence=0.0), "text"
+
+
+def get_structured_answer(question: str, documents, rule_ids):
+    """
+    Answer with a DrivingResponse generated in Ollama's JSON mode.
+
+    The output is constrained to GENERATED_SCHEMA and parsed with
+    parse_driving_response, so a malformed reply never costs a second
+    call; rule_reference lists the ids of the chunks the answer is based on.
+
+    Returns:
+        Tuple of (DrivingResponse or None if the request failed, parse method).
+    """
+    model_name = "gemma3"
+    prompt = build_structured_prompt(question, documents, rule_ids)
+
+    try:
+        text = ollama_client.generate(model_name, prompt, timeout=(CONNECT_TIMEOUT, ANSWER_DEADLINE),
+                                      deadline=ANSWER_DEADLINE, format=GENERATED_SCHEMA)
+    except OllamaError as e:
+        print("Error:", e)
+        return None, None
+    return parse_driving_response(text, ", ".join(rule_ids))
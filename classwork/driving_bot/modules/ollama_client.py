@@ -0,0 +1,205 @@
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _parse_host(host: str) -> str:
+    """Base URL from an OLLAMA_HOST value such as "localhost", "0.0.0.0:11434" or "http://gpu-box:11434"."""
+    if "://" not in host:
+        host = f"http://{host}"
+    scheme, address = host.split("://", 1)
+    address = address.rstrip("/")
+    if ":" not in address.split("/")[0]:
+        address = f"{address}:11434"
+    return f"{scheme}://{address.replace('0.0.0.0', '127.0.0.1', 1)}"
+
+
+OLLAMA_URL = _parse_host(os.getenv("OLLAMA_HOST", "localhost:11434"))
+CONNECT_TIMEOUT = 3.0
+# (connect, read) seconds for one attempt; the read timeout bounds the wait
+# for a non-streamed response or, when streaming, for the next chunk.
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, 60.0)
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 2.0
+RETRY_STATUSES = {429, 502, 503, 504}
+POOL_SIZE = 16
+
+
+class OllamaError(Exception):
+    """An Ollama request failed after its retries, or answered with an error status."""
+
+
+class OllamaClient:
+    """
+    Shared HTTP client for the Ollama API.
+
+    Every call goes through one requests.Session with a keep-alive pool of
+    pool_size connections, so consecutive and concurrent calls reuse TCP
+    connections. A call gets a per-attempt timeout and an optional
+    deadline (total seconds across attempts). Connection failures, connect
+    timeouts and 429/502/503/504 answers are retried up to max_retries times
+    with full-jitter exponential backoff; read timeouts are not retried,
+    because the model may still be working on the first attempt.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_URL, timeout=DEFAULT_TIMEOUT, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX, pool_size: int = POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _attempt_timeout(self, timeout, deadline):
+        if deadline is None:
+            return timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._failed()
+            raise OllamaError("deadline exceeded")
+        if isinstance(timeout, tuple):
+            return tuple(min(part, remaining) for part in timeout)
+        return min(timeout, remaining)
+
+    def request(self, method: str, path: str, payload=None, timeout=None, deadline: float = None,
+                stream: bool = False) -> requests.Response:
+        """
+        Send one API request with the retry policy.
+
+        Args:
+            timeout: Seconds (or a (connect, read) tuple) for each attempt; defaults to self.timeout.
+            deadline: Seconds the whole call, retries and backoff included, may take.
+            stream: Return as soon as the headers arrive, for NDJSON streaming.
+
+        Returns:
+            The successful requests.Response.
+
+        Raises:
+            OllamaError: The request failed, timed out or returned an error status.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + deadline if deadline is not None else None
+        with self._lock:
+            self.requests += 1
+        attempt = 0
+        while True:
+            with self._lock:
+                self.attempts += 1
+            error = None
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", json=payload, stream=stream,
+                                                timeout=self._attempt_timeout(timeout, deadline))
+                if response.status_code not in RETRY_STATUSES:
+                    if response.ok:
+                        return response
+                    response.close()
+                    self._failed()
+                    raise OllamaError(f"{method} {path} returned {response.status_code}")
+                response.close()
+                error = OllamaError(f"{method} {path} returned {response.status_code}")
+            except requests.ReadTimeout as e:
+                self._failed()
+                raise OllamaError(f"{method} {path} timed out") from e
+            except requests.ConnectionError as e:
+                error = e
+
+            delay = self._backoff(attempt)
+            if attempt >= self.max_retries or (deadline is not None and time.monotonic() + delay >= deadline):
+                self._failed()
+                raise OllamaError(f"{method} {path} failed after {attempt + 1} attempts: {error}") from error
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            time.sleep(delay)
+
+    def _failed(self):
+        with self._lock:
+            self.failures += 1
+
+    def generate(self, model: str, prompt: str, timeout=None, deadline: float = None, **options) -> str:
+        """Non-streamed /api/generate; returns the response text."""
+        response = self.request("POST", "/api/generate", {"model": model, "prompt": prompt, "stream": False, **options},
+                                timeout=timeout, deadline=deadline)
+        return response.json()["response"]
+
+    def generate_stream(self, model: str, prompt: str, timeout=None, deadline: float = None, **options):
+        """
+        Streamed /api/generate: yields the parsed NDJSON chunks as they arrive.
+
+        Only connecting is retried; once tokens flow, errors are raised. The
+        read timeout bounds the wait for each chunk and the deadline the
+        whole stream. Closing the generator closes the connection, which
+        makes Ollama stop generating.
+        """
+        started = time.monotonic()
+        response = self.request("POST", "/api/generate", {"model": model, "prompt": prompt, "stream": True, **options},
+                                timeout=timeout, deadline=deadline, stream=True)
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise OllamaError(chunk["error"])
+                yield chunk
+                if chunk.get("done"):
+                    return
+                if deadline is not None and time.monotonic() - started > deadline:
+                    raise OllamaError("deadline exceeded")
+        except requests.RequestException as e:
+            self._failed()
+            raise OllamaError(f"stream interrupted: {e}") from e
+        finally:
+            response.close()
+
+    def embeddings(self, model: str, prompt: str, timeout=None, deadline: float = None):
+        """/api/embeddings for one text; returns the vector."""
+        response = self.request("POST", "/api/embeddings", {"model": model, "prompt": prompt},
+                                timeout=timeout, deadline=deadline)
+        return response.json()["embedding"]
+
+    def embed(self, model: str, inputs, timeout=None, deadline: float = None):
+        """/api/embed for a batch of texts in one request; returns one (normalized) vector per text."""
+        response = self.request("POST", "/api/embed", {"model": model, "input": list(inputs)},
+                                timeout=timeout, deadline=deadline)
+        return response.json()["embeddings"]
+
+    def model_names(self, timeout=2.0):
+        """Names of the locally available models (/api/tags)."""
+        response = self.request("GET", "/api/tags", timeout=timeout)
+        return {model["name"] for model in response.json().get("models", [])}
+
+    def stats(self):
+        """Request counters plus connection reuse taken from the urllib3 pools."""
+        pools = self.session.get_adapter(self.base_url).poolmanager.pools
+        pools = [pools[key] for key in pools.keys()]
+        connections = sum(pool.num_connections for pool in pools)
+        sent = sum(pool.num_requests for pool in pools)
+        return {
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failures": self.failures,
+            "connections_opened": connections,
+            "connections_reused": max(0, sent - connections),
+        }
+
+
+ollama_client = OllamaClient()
@@ -1,50 +1,194 @@
-from .embedding import query
-from .llm_setup import get_driving_answer, validate_driving_question
-
-
-def ask_driving_question(question: str, collection):
-    print(f"Validating question relevance...")
-    
-    # First validate if the question is related to Lithuanian driving rules
-    is_relevant = validate_driving_question(question)
-    
-    if not is_relevant:
-        return "I'm sorry, but I can only answer questions related to Lithuanian traffic rules and driving regulations. Please ask a question about Lithuanian driving laws, traffic signs, road safety, or similar topics."
-    
-    print(f"Searching for relevant traffic rules...")
-    
-    result = query(question, collection)
-    
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .embedding import get_embedding, query_by_embedding
+from .llm_setup import (ANSWER_MAX_TOKENS, DrivingResponse, get_driving_answer, get_structured_answer,
+                        stream_driving_answer, validate_driving_question)
+from .ollama_client import OllamaError
+from .relevance import relevance_gate
+
+NOT_RELEVANT_ANSWER = "I'm sorry, but I can only answer questions related to Lithuanian traffic rules and driving regulations. Please ask a question about Lithuanian driving laws, traffic signs, road safety, or similar topics."
+NOT_FOUND_ANSWER = "I couldn't find relevant information about that in the Lithuanian traffic rules."
+ERROR_ANSWER = "Sorry, I encountered an error while processing your question."
+
+# LLM relevance validation runs here while the calling thread does retrieval.
+validation_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="validation")
+
+
+def _timed_validation(question: str):
+    started = time.perf_counter()
+    return validate_driving_question(question), time.perf_counter() - started
+
+
+def print_timings(timings):
+    print("Timings: " + ", ".join(f"{stage} {seconds:.2f} s" for stage, seconds in timings.items()))
+
+
+def find_context(question: str, collection, timings):
+    """
+    Check that the question is about Lithuanian traffic rules and retrieve its context.
+
+    The question embedding is needed for retrieval anyway, so it is
+    computed first and relevance_gate decides with its cheap tiers
+    (keywords, then similarity to the indexed rules). Only a question in
+    the gate's ambiguous band is sent to the LLM validator, which then runs
+    on validation_executor while this thread queries Chroma; that
+    speculative retrieval result is discarded if the LLM says the question
+    is off topic.
+
+    Returns:
+        Tuple of (documents, rule ids, None) for an answerable question, or
+        (None, None, the fixed reply) when it is off topic or nothing
+        relevant was found.
+    """
+    print(f"Validating question relevance and searching for relevant traffic rules...")
+
+    stage_started = time.perf_counter()
+    embedding = get_embedding(question).embedding
+    timings["embedding"] = time.perf_counter() - stage_started
+
+    stage_started = time.perf_counter()
+    is_relevant, tier = relevance_gate.check(question, embedding, collection)
+    timings[f"gate ({tier})"] = time.perf_counter() - stage_started
+    if is_relevant is False:
+        return None, None, NOT_RELEVANT_ANSWER
+
+    validation = validation_executor.submit(_timed_validation, question) if is_relevant is None else None
+    result, retrieval_error = None, None
+    try:
+        stage_started = time.perf_counter()
+        result = query_by_embedding(embedding, collection)
+        timings["retrieval"] = time.perf_counter() - stage_started
+    except Exception as e:
+        retrieval_error = e
+
+    if validation is not None:
+        is_relevant, timings["validation"] = validation.result()
+        if not is_relevant:
+            return None, None, NOT_RELEVANT_ANSWER
+
+    if retrieval_error is not None:
+        raise retrieval_error
+
     if not result['documents'] or not result['documents'][0]:
-        return "I couldn't find relevant information about that in the Lithuanian traffic rules."
-    
-    context = "\n".join(result['documents'][0])
-    
+        return None, None, NOT_FOUND_ANSWER
+
+    return result['documents'][0], result['ids'][0], None
+
+
+def ask_driving_question(question: str, collection, verbose: bool = False, stream: bool = False,
+                         max_tokens: int = ANSWER_MAX_TOKENS, structured: bool = False):
+    """
+    Answer a question from the stored traffic rules.
+
+    The answer is only generated once validation has accepted the question
+    (see find_context).
+
+    Args:
+        verbose: Print per-stage timings.
+        stream: Return a generator of answer pieces (iter_driving_answer)
+            instead of the whole answer.
+        max_tokens: Cut-off for streamed answers.
+        structured: Return a DrivingResponse (generated in JSON mode, with
+            rule_reference listing the retrieved rule ids) instead of text;
+            fixed replies get confidence 0 and an empty rule_reference.
+    """
+    if stream:
+        return iter_driving_answer(question, collection, max_tokens)
+
+    started = time.perf_counter()
+    timings = {}
+    documents, rule_ids, reply = find_context(question, collection, timings)
+
+    if reply is not None:
+        if verbose:
+            timings["total"] = time.perf_counter() - started
+            print_timings(timings)
+        return DrivingResponse(answer=reply, rule_reference="", confidence=0.0) if structured else reply
+
     print(f"Found relevant rules. Generating answer...")
-    
-    answer = get_driving_answer(question, context)
-    
+
+    stage_started = time.perf_counter()
+    if structured:
+        answer, _ = get_structured_answer(question, documents, rule_ids)
+    else:
+        answer = get_driving_answer(question, "\n".join(documents))
+    timings["answer"] = time.perf_counter() - stage_started
+    if verbose:
+        timings["total"] = time.perf_counter() - started
+        print_timings(timings)
+
     if answer is None:
-        return "Sorry, I encountered an error while processing your question."
-    
+        return DrivingResponse(answer=ERROR_ANSWER, rule_reference="", confidence=0.0) if structured else ERROR_ANSWER
+
     return answer
 
 
-def interactive_query(collection):
+def iter_driving_answer(question: str, collection, max_tokens: int = ANSWER_MAX_TOKENS, timings=None):
+    """
+    Answer a question as a stream of text pieces, for front ends that show tokens as they arrive.
+
+    Fixed replies (off topic, nothing found, errors) are yielded as a single
+    piece. Closing the generator stops generation on the Ollama server.
+
+    Args:
+        timings: Optional dict filled with the stage timings, including
+            first_token (seconds from the question to the first answer
+            token) and total.
+    """
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
+    try:
+        documents, _, reply = find_context(question, collection, timings)
+        if reply is not None:
+            yield reply
+            return
+
+        print(f"Found relevant rules. Generating answer...")
+        stage_started = time.perf_counter()
+        try:
+            for piece in stream_driving_answer(question, "\n".join(documents), max_tokens):
+                if "first_token" not in timings:
+                    timings["first_token"] = time.perf_counter() - started
+                yield piece
+        except OllamaError as e:
+            print("Error:", e)
+            yield ERROR_ANSWER
+        timings["answer"] = time.perf_counter() - stage_started
+    finally:
+        timings["total"] = time.perf_counter() - started
+
+
+def interactive_query(collection, verbose: bool = False, stream: bool = True, max_tokens: int = ANSWER_MAX_TOKENS):
     print("Welcome to the Lithuanian Traffic Rules Assistant!")
     print("Ask me any question about Lithuanian traffic rules. Type 'exit' to quit.")
     print("Note: I can only answer questions related to Lithuanian driving laws and traffic regulations.")
-    
+    if stream:
+        print("Press Ctrl-C to stop an answer.")
+
     while True:
         question = input("\nYour question: ")
-        
+
         if 'exit' in question.lower():
             print("Goodbye!")
             break
-        
+
         if not question.strip():
             print("Please enter a question.")
             continue
-        
-        answer = ask_driving_question(question, collection)
-        print(f"\nAnswer: {answer}") 
\ No newline at end of file
+
+        if not stream:
+            answer = ask_driving_question(question, collection, verbose)
+            print(f"\nAnswer: {answer}")
+            continue
+
+        timings = {}
+        pieces = iter_driving_answer(question, collection, max_tokens, timings)
+        try:
+            for i, piece in enumerate(pieces):
+                print("\nAnswer: " + piece if i == 0 else piece, end="", flush=True)
+            print()
+        except KeyboardInterrupt:
+            pieces.close()
+            print("\n[answer stopped]")
+        if verbose:
+            print_timings(timings)
@@ -0,0 +1,162 @@
+import re
+import threading
+
+import numpy as np
+
+# Phrases and stems that are only used about traffic, in Lithuanian (word
+# stems, so that inflected forms match) and English. A match accepts the
+# question without asking the LLM, so generic words that also occur off
+# topic ("road", "license", "speed", "kelias", "greitis", "bauda", ...)
+# are deliberately left out: questions using only those go to the next
+# tiers.
+TRAFFIC_PATTERN = re.compile(r"""
+    \b(
+        eism\w* | ket | kelių\s+eism\w* | kelio\s+ženkl\w* | sankryž\w* | pervaž\w* | šviesofor\w*
+        | vairuotojo\s+pažymėjim\w* | vairavimo\s+egzamin\w* | transporto\s+priemon\w*
+        | pėsčiųjų\s+perėj\w* | leistin\w*\s+greit\w* | greičio\s+ribojim\w* | ištisin\w*\s+linij\w*
+        | pirmumo\s+teis\w* | saugos\s+dirž\w* | technin\w*\s+apžiūr\w* | promil\w* | žiemin\w*\s+padang\w*
+        | traffic\s+(rules?|laws?|code|regulations?|lights?|signs?|signals?|police|violations?|accidents?|fines?)
+        | road\s+(rules|signs?|markings?|safety) | rules\s+of\s+the\s+road | highway\s+code
+        | driv(ing|er'?s?)\s+licen[cs]es? | driving\s+(test|exam|lessons?) | while\s+driving
+        | speed\s+limits? | speeding\s+(fines?|tickets?) | seat\s*belts? | pedestrian\s+crossings? | crosswalks?
+        | zebra\s+crossings? | roundabouts? | turn\s+(right|left)\s+on\s+(a\s+)?red | parking\s+(rules|fines?|tickets?)
+        | park\s+(my|a|the)\s+car | dipped\s+headlights? | emergency\s+vehicles? | vehicle\s+registration
+        | right\s+of\s+way | give\s+way | drunk\s+driving | drink[\s-]driving | blood\s+alcohol
+        | (winter|studded)\s+tyres?
+    )\b
+""", re.IGNORECASE | re.VERBOSE)
+
+# Mentions of other countries: the bot only knows the Lithuanian rules, so
+# such questions always go to the next tier even if they use traffic words.
+FOREIGN_PATTERN = re.compile(r"""
+    \b(
+        german\w* | vokietij\w* | france | french | prancūzij\w* | poland | polish | lenkij\w* | latvi\w* | estoni\w*
+        | usa | america\w* | amerik\w* | united\s+states | uk | britain | british | england | anglij\w*
+        | spain | ispanij\w* | ital(y|ian) | italij\w* | russia\w* | rusij\w* | belarus\w* | baltarusij\w*
+        | ukrain\w* | abroad | užsien\w* | other\s+countr\w* | kitose\s+šalyse
+    )\b
+""", re.IGNORECASE | re.VERBOSE)
+
+# Cosine similarity of the question to its closest indexed rule chunk
+# (nomic-embed-text). At or above EMBEDDING_ACCEPT the question is accepted,
+# below EMBEDDING_REJECT it is rejected; the band in between goes to the
+# LLM. Recalibrate with `python test_validation.py --benchmark` after
+# changing the model or the source. The embedding tier does not reject
+# (EMBEDDING_REJECT is None) until the thresholds have been calibrated on
+# the real model.
+EMBEDDING_ACCEPT = 0.62
+EMBEDDING_REJECT = None
+
+
+def keyword_decision(question: str):
+    """Tier 1: True if the question uses traffic vocabulary (and names no other country), else None (undecided)."""
+    if FOREIGN_PATTERN.search(question):
+        return None
+    return True if TRAFFIC_PATTERN.search(question) else None
+
+
+class RelevanceGate:
+    """
+    Tiered relevance check in front of the LLM validator.
+
+    1. keyword: a compiled keyword/regex matcher over Lithuanian and
+       English traffic vocabulary accepts obvious questions.
+    2. embedding: the cosine similarity between the question embedding
+       and the closest indexed rule chunk accepts questions at or above
+       accept_threshold and, if reject_threshold is set, rejects those
+       below it.
+    3. llm: only questions left in the band are sent to the gemma3
+       validator by the caller.
+
+    The normalized rule embeddings are read from the collection once and
+    kept in memory; load() again after rebuilding the index.
+    """
+
+    def __init__(self, accept_threshold: float = EMBEDDING_ACCEPT, reject_threshold: float = EMBEDDING_REJECT):
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self._lock = threading.Lock()
+        self._rules = None
+        self._collection_key = None
+        self.decisions = {"keyword": 0, "embedding": 0, "llm": 0}
+
+    def load(self, collection):
+        rows = collection.get(include=["embeddings"])
+        rules = np.asarray(rows["embeddings"], dtype=np.float32)
+        if len(rules):
+            rules /= np.maximum(np.linalg.norm(rules, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            self._rules = rules
+            self._collection_key = (collection.name, collection.count())
+
+    def similarity(self, embedding, collection) -> float:
+        """Cosine similarity between embedding and the closest rule chunk of collection."""
+        if self._collection_key != (collection.name, collection.count()):
+            self.load(collection)
+        if not len(self._rules):
+            return 0.0
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return float((self._rules @ (vector / norm)).max()) if norm else 0.0
+
+    def embedding_decision(self, similarity: float):
+        """Tier 2: True/False outside the ambiguous band, None inside it (or below it while rejecting is off)."""
+        if similarity >= self.accept_threshold:
+            return True
+        if self.reject_threshold is not None and similarity < self.reject_threshold:
+            return False
+        return None
+
+    def check(self, question: str, embedding=None, collection=None):
+        """
+        Run the cheap tiers.
+
+        Args:
+            embedding: The question embedding; without it (or the collection)
+                only the keyword tier runs.
+
+        Returns:
+            Tuple of (decision, tier): decision is True/False, or None when the
+            LLM has to decide, in which case tier is "llm".
+        """
+        decision, tier = keyword_decision(question), "keyword"
+        if decision is None and embedding is not None and collection is not None:
+            decision, tier = self.embedding_decision(self.similarity(embedding, collection)), "embedding"
+            # A question about another country resembles the rules too; only the LLM may accept it.
+            if decision and FOREIGN_PATTERN.search(question):
+                decision = None
+        if decision is None:
+            tier = "llm"
+        with self._lock:
+            self.decisions[tier] += 1
+        return decision, tier
+
+    def stats(self):
+        return {
+            "accept_threshold": self.accept_threshold,
+            "reject_threshold": self.reject_threshold,
+            "decisions": dict(self.decisions),
+        }
+
+
+def calibrate_thresholds(relevant_similarities, irrelevant_similarities):
+    """
+    Thresholds that make the embedding tier error-free on a labeled set.
+
+    accept is just above the most similar irrelevant question and reject
+    just below the least similar relevant one; everything in between is
+    left to the LLM. If the two groups do not overlap the band collapses
+    to their midpoint.
+
+    Returns:
+        Tuple of (accept_threshold, reject_threshold).
+    """
+    highest_irrelevant = max(irrelevant_similarities)
+    lowest_relevant = min(relevant_similarities)
+    if highest_irrelevant < lowest_relevant:
+        middle = (highest_irrelevant + lowest_relevant) / 2
+        return middle, middle
+    return highest_irrelevant + 1e-3, lowest_relevant - 1e-3
+
+
+relevance_gate = RelevanceGate()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the batch question-answering mode: reading question sets and
+answering them against a local fake Ollama server and an in-memory index.
+"""
+
+import json
+
+import pytest
+
+from fake_ollama import start_fake_ollama
+from modules import batch, embedding, llm_setup
+from modules.embedding_cache import EmbeddingCache
+from modules.ollama_client import OllamaClient
+
+chromadb = pytest.importorskip("chromadb")
+
+
+def test_read_questions(tmp_path):
+    jsonl = tmp_path / "questions.jsonl"
+    jsonl.write_text('{"id": "q1", "question": "Koks greitis?"}\n\n{"question": "Ar reikia šalmo?"}\n',
+                     encoding="utf-8")
+    csv = tmp_path / "questions.csv"
+    csv.write_text("question,id\nKoks greitis?,a\n,b\nAr reikia šalmo?,\n", encoding="utf-8")
+    assert batch.read_questions(str(jsonl)) == [{"id": "q1", "question": "Koks greitis?"},
+                                                {"id": "2", "question": "Ar reikia šalmo?"}]
+    assert batch.read_questions(str(csv)) == [{"id": "a", "question": "Koks greitis?"},
+                                              {"id": "3", "question": "Ar reikia šalmo?"}]
+
+
+def test_answer_batch(monkeypatch):
+    server, url = start_fake_ollama(response="Atsakymas")
+    client = OllamaClient(url)
+    monkeypatch.setattr(embedding, "ollama_client", client)
+    monkeypatch.setattr(llm_setup, "ollama_client", client)
+    cache = EmbeddingCache(":memory:")
+    monkeypatch.setattr(embedding, "get_embedding_cache", lambda: cache)
+    collection = chromadb.EphemeralClient().get_or_create_collection("test_batch_rules")
+    collection.upsert(ids=["rule-1", "rule-2"], documents=["Greitis gyvenvietėje 50 km/h.", "Šalmas privalomas."],
+                      embeddings=[[10.0, 1.0, 0.0], [20.0, 1.0, 0.0]])
+    items = [{"id": str(i), "question": f"Koks leistinas greitis {i}?"} for i in range(10)]
+    try:
+        results = list(batch.answer_batch(items, collection, workers=4))
+    finally:
+        server.shutdown()
+
+    assert [result["id"] for result in results] == [item["id"] for item in items]
+    assert all(result["answer"] == "Atsakymas" and len(result["rule_ids"]) == 2 for result in results)
+    assert all(result["rule_reference"] == ", ".join(result["rule_ids"]) for result in results)
+    embed_calls = [body for path, body in server.requests if path == "/api/embed"]
+    assert len(embed_calls) == 1 and len(embed_calls[0]["input"]) == 10
+    json.dumps(results)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
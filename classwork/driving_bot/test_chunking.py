@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Parity test for the native chunker.
+Checks that modules.chunking produces exactly the chunk boundaries of
+LangChain's RecursiveCharacterTextSplitter on the driving rules source and
+on random texts full of separators.
+"""
+
+import os
+import random
+
+import pytest
+
+from modules.chunking import split_text
+from modules.data_collector import get_chunks_of_text, read_source_file
+
+SOURCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "source.txt")
+
+text_splitters = pytest.importorskip("langchain_text_splitters")
+
+
+def langchain_chunks(text, chunk_size, chunk_overlap):
+    splitter = text_splitters.RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return splitter.split_text(text)
+
+
+@pytest.mark.parametrize("chunk_size, chunk_overlap", [(750, 100), (1000, 200), (200, 0), (40, 10), (1, 0)])
+def test_source_parity(chunk_size, chunk_overlap):
+    text = read_source_file(SOURCE_FILE)
+    assert split_text(text, chunk_size, chunk_overlap) == langchain_chunks(text, chunk_size, chunk_overlap)
+
+
+def test_random_text_parity():
+    rng = random.Random(0)
+    pieces = ["word", "a", " ", "  ", "\n", "\n\n", "\n\n\n", "\t", "x" * 60, " \n "]
+    for _ in range(500):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 150)))
+        chunk_size = rng.randint(1, 100)
+        chunk_overlap = rng.randint(0, chunk_size - 1)
+        assert split_text(text, chunk_size, chunk_overlap) == langchain_chunks(text, chunk_size, chunk_overlap), \
+            (text, chunk_size, chunk_overlap)
+
+
+def test_spans_point_into_text():
+    text = read_source_file(SOURCE_FILE)
+    for chunk in get_chunks_of_text(text):
+        assert text[chunk.start:chunk.end] == chunk.page_content
+
+
+if __name__ == "__main__":
+    for size, overlap in [(750, 100), (1000, 200), (200, 0)]:
+        test_source_parity(size, overlap)
+    test_random_text_parity()
+    test_spans_point_into_text()
+    print("Chunker parity: OK")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared Ollama client against a local fake Ollama server:
+connection reuse, retries on transient errors, timeouts and deadlines, and
+streamed answers.
+"""
+
+import time
+
+import pytest
+
+from fake_ollama import start_fake_ollama
+from modules import llm_setup
+from modules.ollama_client import OllamaClient, OllamaError, _parse_host
+
+
+@pytest.fixture
+def fake():
+    server, url = start_fake_ollama()
+    yield server, url
+    server.shutdown()
+
+
+def test_connections_are_reused(fake):
+    server, url = fake
+    client = OllamaClient(url)
+    for _ in range(5):
+        assert client.generate("gemma3", "Ar privalomi saugos diržai?") == "YES"
+    assert client.embeddings("nomic-embed-text", "abc") == [3.0, 1.0, 0.0]
+    assert server.connections == 1
+    stats = client.stats()
+    assert stats["requests"] == 6
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 5
+
+
+def test_transient_errors_are_retried(fake):
+    server, url = fake
+    server.failures = [503, 502]
+    client = OllamaClient(url, backoff_base=0.01)
+    assert client.generate("gemma3", "prompt") == "YES"
+    assert len(server.requests) == 3
+    assert client.stats()["retries"] == 2
+
+
+def test_retries_are_bounded(fake):
+    server, url = fake
+    server.failures = [503] * 10
+    client = OllamaClient(url, max_retries=2, backoff_base=0.01)
+    with pytest.raises(OllamaError):
+        client.generate("gemma3", "prompt")
+    assert len(server.requests) == 3
+    assert client.stats()["failures"] == 1
+
+
+def test_client_errors_are_not_retried(fake):
+    server, url = fake
+    server.failures = [404]
+    client = OllamaClient(url, backoff_base=0.01)
+    with pytest.raises(OllamaError):
+        client.generate("missing-model", "prompt")
+    assert len(server.requests) == 1
+
+
+def test_read_timeout(fake):
+    server, url = fake
+    server.delay = 0.5
+    client = OllamaClient(url)
+    started = time.monotonic()
+    with pytest.raises(OllamaError):
+        client.generate("gemma3", "prompt", timeout=(1.0, 0.1))
+    assert time.monotonic() - started < 0.45
+    assert len(server.requests) == 1
+
+
+def test_deadline_covers_retries(fake):
+    server, url = fake
+    server.failures = [503] * 10
+    client = OllamaClient(url, max_retries=10, backoff_base=0.1, backoff_max=0.1)
+    started = time.monotonic()
+    with pytest.raises(OllamaError):
+        client.generate("gemma3", "prompt", deadline=0.3)
+    assert time.monotonic() - started < 0.45
+
+
+def test_unreachable_server():
+    client = OllamaClient("http://127.0.0.1:9", max_retries=1, backoff_base=0.01)
+    with pytest.raises(OllamaError):
+        client.model_names()
+    assert client.stats()["attempts"] == 2
+
+
+def test_parse_host():
+    assert _parse_host("localhost") == "http://localhost:11434"
+    assert _parse_host("0.0.0.0:11434") == "http://127.0.0.1:11434"
+    assert _parse_host("https://gpu-box:8443/") == "https://gpu-box:8443"
+
+
+def test_stream_yields_tokens(fake):
+    server, url = fake
+    server.response = "Leidžiamas greitis gyvenvietėse yra 50 km/h."
+    client = OllamaClient(url)
+    pieces = [chunk["response"] for chunk in client.generate_stream("gemma3", "prompt")]
+    assert "".join(pieces) == server.response
+    assert server.requests[-1][1]["stream"] is True
+
+
+def test_stream_answer_stops_at_max_tokens(fake, monkeypatch):
+    server, url = fake
+    server.response = " ".join(f"word{i}" for i in range(100))
+    monkeypatch.setattr(llm_setup, "ollama_client", OllamaClient(url))
+    pieces = list(llm_setup.stream_driving_answer("question", "context", max_tokens=5))
+    assert "".join(pieces) == "word0 word1 word2 word3 word4"
+    assert server.requests[-1][1]["options"]["num_predict"] == 5
+
+
+def test_closing_stream_cancels_generation(fake, monkeypatch):
+    server, url = fake
+    server.response = " ".join(f"word{i}" for i in range(100))
+    server.token_interval = 0.01
+    monkeypatch.setattr(llm_setup, "ollama_client", OllamaClient(url))
+    pieces = llm_setup.stream_driving_answer("question", "context", max_tokens=None)
+    assert next(pieces) == "word0"
+    pieces.close()
+    deadline = time.monotonic() + 2
+    while not server.cancelled and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.cancelled == 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for structured answers: parsing the model output into a
+DrivingResponse and JSON-mode generation against a local fake Ollama server.
+"""
+
+import json
+
+import pytest
+
+from fake_ollama import start_fake_ollama
+from modules import llm_setup
+from modules.llm_setup import DrivingResponse, parse_driving_response
+from modules.ollama_client import OllamaClient
+
+
+def test_valid_json_is_parsed_directly():
+    response, method = parse_driving_response('{"answer": "50 km/h.", "confidence": 0.9}', "rule-3")
+    assert method == "json"
+    assert response == DrivingResponse(answer="50 km/h.", rule_reference="rule-3", confidence=0.9)
+
+
+@pytest.mark.parametrize("text, confidence", [
+    ('```json\n{"answer": "50 km/h.", "confidence": 0.8}\n```', 0.8),
+    ('Here is the answer: {"answer": "50 km/h.", "confidence": "80%"}', 0.8),
+    ('{"answer": "50 km/h.", "confidence": 80}', 0.8),
+    ('{"answer": "50 km/h.", "confidence": 1.5}', 1.0),
+    ('{"answer": "50 km/h.", "confidence": "high"}', 0.0),
+    ('{"answer": "50 km/h."}', 0.0),
+])
+def test_malformed_json_is_repaired(text, confidence):
+    response, method = parse_driving_response(text, "rule-3")
+    assert method == "repaired"
+    assert response.answer == "50 km/h."
+    assert response.confidence == pytest.approx(confidence)
+
+
+def test_prose_falls_back_to_text():
+    response, method = parse_driving_response(" Leidžiamas greitis yra 50 km/h. ", "rule-1, rule-2")
+    assert method == "text"
+    assert response == DrivingResponse(answer="Leidžiamas greitis yra 50 km/h.", rule_reference="rule-1, rule-2",
+                                       confidence=0.0)
+
+
+def test_structured_answer_uses_json_mode(monkeypatch):
+    server, url = start_fake_ollama(response=json.dumps({"answer": "Šalmas privalomas.", "confidence": 0.95}))
+    monkeypatch.setattr(llm_setup, "ollama_client", OllamaClient(url))
+    try:
+        response, method = llm_setup.get_structured_answer("Ar reikia šalmo?", ["Šalmas privalomas."], ["rule-7"])
+    finally:
+        server.shutdown()
+
+    assert method == "json"
+    assert response == DrivingResponse(answer="Šalmas privalomas.", rule_reference="rule-7", confidence=0.95)
+    generate_calls = [body for path, body in server.requests if path == "/api/generate"]
+    assert len(generate_calls) == 1
+    assert generate_calls[0]["format"] == llm_setup.GENERATED_SCHEMA
+    assert "[rule-7] Šalmas privalomas." in generate_calls[0]["prompt"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -3,59 +3,169 @@
 Test script for the driving bot validation functionality.
 This script tests whether the validation correctly identifies
 questions related to Lithuanian driving rules.
+
+Run with --benchmark (needs Ollama and the index) to measure accuracy,
+coverage and average latency of every tier of the relevance gate on the
+labeled questions below, and to print calibrated embedding thresholds.
 """
 
+import argparse
+import time
+
 from modules.llm_setup import validate_driving_question
+from modules.relevance import RelevanceGate, calibrate_thresholds, keyword_decision
+
+# Relevant questions (should return True)
+relevant_questions = [
+    "What is the speed limit in urban areas in Lithuania?",
+    "Can I turn right on red light in Lithuania?",
+    "What are the requirements for getting a driving license in Lithuania?",
+    "What should I do at a pedestrian crossing?",
+    "Are seatbelts mandatory in Lithuania?",
+    "What are the rules for parking in Vilnius?",
+    "How should I behave when emergency vehicles approach?",
+    "What are the penalties for drunk driving in Lithuania?",
+    "Can cyclists use the road in Lithuania?",
+    "What documents do I need to carry while driving?",
+    "Koks leistinas greitis gyvenvietėje?",
+    "Ar galima lenkti per ištisinę liniją?",
+    "Kada privaloma naudoti žiemines padangas?",
+    "Kas turi pirmumo teisę nereguliuojamoje sankryžoje?",
+    "Ar vaikas gali sėdėti priekinėje sėdynėje?",
+    "Kiek promilių leidžiama pradedančiajam?",
+    "Who has priority at a roundabout?",
+    "When must I switch on dipped headlights?",
+    "May a child ride in the front seat?",
+    "What does a flashing yellow signal mean?",
+]
+
+# Irrelevant questions (should return False)
+irrelevant_questions = [
+    "How do I cook pasta?",
+    "What's the weather like today?",
+    "Tell me a joke",
+    "What are the rules for driving in Germany?",
+    "How do I fix a flat tire?",
+    "What's the capital of France?",
+    "Can you help me with my math homework?",
+    "What's the best restaurant in town?",
+    "How do I apply for a job?",
+    "What's the latest news?",
+    "Kaip išsivirti makaronus?",
+    "Koks rytoj bus oras Vilniuje?",
+    "Kiek kainuoja bilietas į koncertą?",
+    "Kaip pakeisti automobilio variklio alyvą?",
+    "Kokie kelių eismo reikalavimai galioja Vokietijoje?",
+    "Who won the basketball game yesterday?",
+    "Recommend a good book",
+    "How do I reset my router?",
+    "What is the meaning of life?",
+    "Write me a poem about the sea",
+    # Off topic, but using words that also occur in traffic questions.
+    "What is the best road trip playlist?",
+    "How do I get a fishing license?",
+    "What is the penalty for late tax filing?",
+    "How do I drive more traffic to my website?",
+    "Which lane should I choose at the supermarket checkout?",
+    "What helmets are best for skiing?",
+    "How can I speed up my laptop?",
+    "Which bicycle should I buy for my child?",
+    "Kiek kainuoja kelias į Paryžių lėktuvu?",
+    "Kokia bauda už pavėluotą mokesčių deklaraciją?",
+    "Kaip padidinti interneto greitį?",
+]
+
+LABELED_QUESTIONS = [(q, True) for q in relevant_questions] + [(q, False) for q in irrelevant_questions]
 
 def test_validation():
     """Test the validation function with various types of questions."""
-    
-    # Relevant questions (should return True)
-    relevant_questions = [
-        "What is the speed limit in urban areas in Lithuania?",
-        "Can I turn right on red light in Lithuania?",
-        "What are the requirements for getting a driving license in Lithuania?",
-        "What should I do at a pedestrian crossing?",
-        "Are seatbelts mandatory in Lithuania?",
-        "What are the rules for parking in Vilnius?",
-        "How should I behave when emergency vehicles approach?",
-        "What are the penalties for drunk driving in Lithuania?",
-        "Can cyclists use the road in Lithuania?",
-        "What documents do I need to carry while driving?"
-    ]
-    
-    # Irrelevant questions (should return False)
-    irrelevant_questions = [
-        "How do I cook pasta?",
-        "What's the weather like today?",
-        "Tell me a joke",
-        "What are the rules for driving in Germany?",
-        "How do I fix a flat tire?",
-        "What's the capital of France?",
-        "Can you help me with my math homework?",
-        "What's the best restaurant in town?",
-        "How do I apply for a job?",
-        "What's the latest news?"
-    ]
-    
     print("Testing Lithuanian Driving Rules Validation")
     print("=" * 50)
-    
+
     print("\nTesting RELEVANT questions (should return True):")
     print("-" * 40)
-    for i, question in enumerate(relevant_questions, 1):
+    for i, question in enumerate(relevant_questions[:10], 1):
         result = validate_driving_question(question)
         status = "PASS" if result else "FAIL"
         print(f"{i:2d}. {status} - {question}")
-    
+
     print("\nTesting IRRELEVANT questions (should return False):")
     print("-" * 40)
-    for i, question in enumerate(irrelevant_questions, 1):
+    for i, question in enumerate(irrelevant_questions[:10], 1):
         result = validate_driving_question(question)
         status = "PASS" if not result else "FAIL"
         print(f"{i:2d}. {status} - {question}")
-    
+
     print("\nValidation test completed!")
 
+def test_keyword_tier():
+    """The keyword tier may only accept, and must never accept an irrelevant question."""
+    accepted = [question for question, _ in LABELED_QUESTIONS if keyword_decision(question)]
+    assert not [question for question in accepted if question in irrelevant_questions]
+    assert len(accepted) >= len(relevant_questions) // 2
+
+def test_embedding_tier_does_not_reject_uncalibrated():
+    """Until the thresholds are calibrated, low similarity leaves the decision to the LLM."""
+    gate = RelevanceGate()
+    assert gate.embedding_decision(0.0) is None
+    assert gate.embedding_decision(gate.accept_threshold) is True
+    assert RelevanceGate(reject_threshold=0.45).embedding_decision(0.3) is False
+
+def _report(name, decisions, seconds):
+    decided = [(decision, label) for decision, label in decisions if decision is not None]
+    correct = sum(decision == label for decision, label in decided)
+    accuracy = correct / len(decided) if decided else 0.0
+    print(f"{name:<10} decided {len(decided):>3}/{len(decisions)}  accuracy {accuracy:6.1%}  "
+          f"avg latency {seconds / len(decisions) * 1000:8.1f} ms")
+
+def benchmark(collection):
+    """Accuracy, coverage and average latency per tier and for the whole gate."""
+    from modules.embedding import get_embedding
+
+    gate = RelevanceGate()
+    embeddings = {question: get_embedding(question).embedding for question, _ in LABELED_QUESTIONS}
+    gate.load(collection)
+
+    started = time.perf_counter()
+    decisions = [(keyword_decision(question), label) for question, label in LABELED_QUESTIONS]
+    _report("keyword", decisions, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    similarities = [(gate.similarity(embeddings[question], collection), label) for question, label in LABELED_QUESTIONS]
+    decisions = [(gate.embedding_decision(similarity), label) for similarity, label in similarities]
+    _report("embedding", decisions, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    decisions = [(validate_driving_question(question), label) for question, label in LABELED_QUESTIONS]
+    _report("llm", decisions, time.perf_counter() - started)
+
+    decisions, tiers, seconds = [], {}, 0.0
+    for question, label in LABELED_QUESTIONS:
+        started = time.perf_counter()
+        decision, tier = gate.check(question, embeddings[question], collection)
+        if decision is None:
+            decision = validate_driving_question(question)
+        seconds += time.perf_counter() - started
+        decisions.append((decision, label))
+        tiers[tier] = tiers.get(tier, 0) + 1
+    _report("gate", decisions, seconds)
+    print(f"gate decisions by tier: {tiers}")
+
+    accept, reject = calibrate_thresholds(
+        [similarity for similarity, label in similarities if label],
+        [similarity for similarity, label in similarities if not label],
+    )
+    print(f"calibrated thresholds: EMBEDDING_ACCEPT = {accept:.3f}, EMBEDDING_REJECT = {reject:.3f} "
+          f"(current {gate.accept_threshold}, {gate.reject_threshold})")
+
 if __name__ == "__main__":
-    test_validation() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Relevance validation tests and tier benchmark.")
+    parser.add_argument("--benchmark", action="store_true", help="measure every tier on the labeled questions")
+    args = parser.parse_args()
+    if args.benchmark:
+        from modules.embedding import load_driving_rules
+        _, collection, _ = load_driving_rules()
+        benchmark(collection)
+    else:
+        test_keyword_tier()
+        test_validation()
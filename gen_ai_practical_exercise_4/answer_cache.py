@@ -0,0 +1,146 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Minimum cosine similarity between two question embeddings for the cached
+# answer of one to be returned for the other.
+ANSWER_CACHE_THRESHOLD = 0.95
+ANSWER_CACHE_TTL = 3600
+ANSWER_CACHE_SIZE = 1024
+
+
+class AnswerCache:
+    """
+    Semantic cache of generated /search answers.
+
+    A question hits when its embedding is at least `threshold` cosine-similar
+    to a cached question asked with the same search parameters. Entries expire
+    after `ttl` seconds, the least recently used entry is evicted beyond
+    `max_entries`, and an entry is dropped as soon as any chunk it was
+    answered from is upserted again (see invalidate).
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, ttl: float = ANSWER_CACHE_TTL,
+                 max_entries: int = ANSWER_CACHE_SIZE):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # (collection, chunk id) -> keys of the entries answered from that chunk.
+        self._by_chunk = {}
+        # Bumped on every invalidation of a collection; see begin and store.
+        self._epochs = {}
+        self._ids = itertools.count()
+        # Unit-length question embeddings of all entries, one row each; rebuilt lazily.
+        self._matrix = None
+        self._matrix_keys = []
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+        self.seconds_saved = 0.0
+
+    def begin(self):
+        """Snapshot to pass to store, so answers built from chunks replaced meanwhile are not cached."""
+        with self._lock:
+            return dict(self._epochs)
+
+    def lookup(self, embedding, params=()):
+        """Cached answer for a question similar to embedding, or None."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        now = time.monotonic()
+        with self._lock:
+            if norm and self._entries:
+                if self._matrix is None:
+                    self._matrix_keys = list(self._entries)
+                    self._matrix = np.stack([self._entries[key]["embedding"] for key in self._matrix_keys])
+                similarities = self._matrix @ (vector / norm)
+                for position in np.argsort(-similarities):
+                    if similarities[position] < self.threshold:
+                        break
+                    key = self._matrix_keys[position]
+                    entry = self._entries.get(key)
+                    if entry is None or entry["params"] != params:
+                        continue
+                    if now - entry["created"] > self.ttl:
+                        self._remove(key)
+                        self.expirations += 1
+                        continue
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.seconds_saved += entry["seconds"]
+                    return entry["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, embedding, answer: str, chunks, seconds: float, params=(), epochs=None):
+        """
+        Cache answer for the question embedding.
+
+        Args:
+            chunks: (collection name, chunk id) of every chunk the answer was generated from.
+            seconds: Time it took to produce the answer; added to seconds_saved on every hit.
+            epochs: Result of begin() taken before retrieval; the answer is not cached if
+                one of its collections was invalidated since.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        chunks = {tuple(chunk) for chunk in chunks}
+        with self._lock:
+            if not norm or (epochs is not None and any(
+                    self._epochs.get(collection) != epochs.get(collection) for collection, _ in chunks)):
+                return
+            key = next(self._ids)
+            self._entries[key] = {
+                "embedding": vector / norm,
+                "answer": answer,
+                "chunks": chunks,
+                "params": params,
+                "seconds": seconds,
+                "created": time.monotonic(),
+            }
+            for chunk in chunks:
+                self._by_chunk.setdefault(chunk, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._matrix = None
+
+    def invalidate(self, collection_name: str, chunk_ids):
+        """Drop every entry answered from one of chunk_ids in collection_name."""
+        with self._lock:
+            self._epochs[collection_name] = self._epochs.get(collection_name, 0) + 1
+            for chunk_id in chunk_ids:
+                for key in list(self._by_chunk.get((collection_name, chunk_id), ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for chunk in entry["chunks"]:
+            keys = self._by_chunk.get(chunk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_chunk[chunk]
+        self._matrix = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "seconds_saved": round(self.seconds_saved, 4),
+            "invalidations": self.invalidations,
+            "expirations": self.expirations,
+            "entries": len(self._entries),
+        }
+
+
+answer_cache = AnswerCache()
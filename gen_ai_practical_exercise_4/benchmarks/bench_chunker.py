@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Native chunker versus LangChain's RecursiveCharacterTextSplitter.
+
+Repeats the driving rules source (classwork/driving_bot/data/source.txt)
+until it reaches --size-mb (1 GB by default), then chunks it in a fresh
+subprocess per mode and reports import time, chunking time, throughput and
+peak RSS:
+
+    spans      iter_chunk_spans, offsets only
+    native     split_text, chunk strings
+    langchain  RecursiveCharacterTextSplitter.split_text
+
+Every mode must produce the same number of chunks.
+
+Usage:
+    python benchmarks/bench_chunker.py --size-mb 1024
+    python benchmarks/bench_chunker.py --size-mb 100 --modes spans native langchain
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SOURCE = Path(__file__).resolve().parents[2] / "classwork" / "driving_bot" / "data" / "source.txt"
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_corpus(path, size_mb):
+    block = SOURCE.read_bytes()
+    target = size_mb * 1024 * 1024
+    with open(path, "wb") as f:
+        written = 0
+        while written < target:
+            f.write(block)
+            written += len(block)
+
+
+def run_mode(mode, path, chunk_size, overlap):
+    started = time.perf_counter()
+    if mode == "langchain":
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
+    else:
+        from text_processing import iter_chunk_spans, split_text
+    import_seconds = time.perf_counter() - started
+
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    baseline = peak_rss_mb()
+
+    started = time.perf_counter()
+    if mode == "spans":
+        count = sum(1 for _ in iter_chunk_spans(text, chunk_size, overlap))
+    elif mode == "native":
+        count = len(split_text(text, chunk_size, overlap))
+    else:
+        count = len(splitter.split_text(text))
+    print(json.dumps({
+        "chunks": count,
+        "import_seconds": import_seconds,
+        "seconds": time.perf_counter() - started,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--modes", nargs="+", choices=["spans", "native", "langchain"],
+                        default=["spans", "native", "langchain"])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument("--run", choices=["spans", "native", "langchain"], help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_mode(args.run, args.file, args.chunk_size, args.overlap)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "corpus.txt")
+        write_corpus(path, args.size_mb)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"file: {size_mb:.0f} MB, chunk_size={args.chunk_size}, overlap={args.overlap}")
+        counts = set()
+        for mode in args.modes:
+            command = [sys.executable, __file__, "--run", mode, "--file", path,
+                       "--chunk-size", str(args.chunk_size), "--overlap", str(args.overlap)]
+            output = subprocess.run(command, capture_output=True, text=True, cwd=workdir, check=True).stdout
+            stats = json.loads(output.strip().splitlines()[-1])
+            counts.add(stats["chunks"])
+            print(f"{mode:<10} {stats['chunks']:>9} chunks  import {stats['import_seconds']:6.2f} s  "
+                  f"chunking {stats['seconds']:7.1f} s  {size_mb / stats['seconds']:7.1f} MB/s  "
+                  f"peak RSS {stats['peak_rss_mb']:8.1f} MB (text loaded {stats['baseline_rss_mb']:.1f} MB)")
+        if len(counts) > 1:
+            sys.exit(f"chunk counts differ between modes: {sorted(counts)}")
+
+
+if __name__ == "__main__":
+    main()
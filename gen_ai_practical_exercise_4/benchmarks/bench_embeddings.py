@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Compare chunks per second of the old one-request-per-chunk embedding loop
+against the batched get_embeddings, both against a local stub Ollama server.
+
+Usage:
+    python benchmarks/bench_embeddings.py --chunks 200 --batch-size 32 --concurrency 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from stub_ollama import start_stub_ollama
+
+
+def legacy_get_embeddings(prompt_list):
+    from ollama import embeddings
+    from embedding import EMBEDDING_MODEL
+
+    result = []
+    for fact in prompt_list:
+        result.append(embeddings(model=EMBEDDING_MODEL, prompt=fact))
+    return result
+
+
+def run(label, fn, texts):
+    start = time.perf_counter()
+    vectors = fn(texts)
+    elapsed = time.perf_counter() - start
+    assert len(vectors) == len(texts)
+    print(f"{label:<32} {elapsed:8.3f} s  {len(texts) / elapsed:10.1f} chunks/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--request-latency", type=float, default=0.02, help="stub overhead per HTTP request (s)")
+    parser.add_argument("--item-latency", type=float, default=0.002, help="stub cost per embedded text (s)")
+    args = parser.parse_args()
+
+    server, url = start_stub_ollama(args.request_latency, args.item_latency)
+    os.environ["OLLAMA_HOST"] = url
+    os.environ["EMBEDDING_CACHE_DB"] = ":memory:"
+
+    from embedding import get_embeddings
+
+    texts = [f"chunk {i}: " + "lorem ipsum dolor sit amet " * 30 for i in range(args.chunks)]
+    print(f"{args.chunks} chunks, stub at {url}")
+    legacy = run("sequential /api/embeddings", legacy_get_embeddings, texts)
+    batched = run(
+        f"batched x{args.batch_size}, {args.concurrency} parallel",
+        lambda items: get_embeddings(items, batch_size=args.batch_size, max_concurrency=args.concurrency),
+        texts,
+    )
+    print(f"speedup: {legacy / batched:.1f}x")
+    cached = run("batched, warm embedding cache", get_embeddings, texts)
+    print(f"speedup: {legacy / cached:.1f}x")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
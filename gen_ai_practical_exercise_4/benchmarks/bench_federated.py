@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Federated search across collections versus querying them one at a time.
+
+Creates --collections Chroma collections of --rows random embeddings each in
+a temporary directory, then times federated_query (concurrent fan-out and
+heap merge) against a sequential loop over the same collections, and checks
+that both return the same top-k.
+
+Usage:
+    python benchmarks/bench_federated.py --collections 8 --rows 10000 --k 10
+"""
+
+import argparse
+import asyncio
+import heapq
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DIMENSIONS = 768
+
+
+def build(chroma_client, collections, rows):
+    rng = np.random.default_rng(0)
+    names = []
+    for c in range(collections):
+        collection = chroma_client.get_or_create_collection(name=f"collection-{c}")
+        for start in range(0, rows, 5000):
+            count = min(5000, rows - start)
+            collection.add(
+                ids=[f"{c}-{i}" for i in range(start, start + count)],
+                embeddings=rng.standard_normal((count, DIMENSIONS)).astype(np.float32).tolist(),
+                documents=[f"chunk {i} of collection {c}" for i in range(start, start + count)],
+                metadatas=[{"chunk_index": i, "parity": i % 2} for i in range(start, start + count)],
+            )
+        names.append(collection.name)
+    return names
+
+
+def sequential(chroma_client, names, embedding, k, where):
+    from federated_search import _query_one
+    hits = []
+    for name in names:
+        hits.extend(_query_one(chroma_client, name, embedding, k, where)[0])
+    return heapq.nsmallest(k, hits, key=lambda match: match["distance"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collections", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--where", action="store_true", help='filter on {"parity": 0}')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        from federated_search import federated_query
+        from vector_db import init_chroma
+
+        chroma_client = init_chroma()
+        started = time.perf_counter()
+        names = build(chroma_client, args.collections, args.rows)
+        print(f"built {args.collections} x {args.rows} rows in {time.perf_counter() - started:.1f} s")
+
+        where = {"parity": 0} if args.where else None
+        queries = np.random.default_rng(1).standard_normal((args.queries, DIMENSIONS)).tolist()
+
+        started = time.perf_counter()
+        expected = [sequential(chroma_client, names, query, args.k, where) for query in queries]
+        sequential_seconds = (time.perf_counter() - started) / args.queries
+
+        async def run_federated():
+            return [await federated_query(chroma_client, names, query, args.k, where=where) for query in queries]
+
+        started = time.perf_counter()
+        results = asyncio.run(run_federated())
+        federated_seconds = (time.perf_counter() - started) / args.queries
+
+        assert all([m["id"] for m in r["matches"]] == [m["id"] for m in e] for r, e in zip(results, expected))
+        slowest = max(results[-1]["collections"].values(), key=lambda timing: timing["seconds"])
+        print(f"sequential {sequential_seconds * 1000:8.1f} ms/query")
+        print(f"federated  {federated_seconds * 1000:8.1f} ms/query  "
+              f"speedup {sequential_seconds / federated_seconds:.1f}x  "
+              f"(slowest collection {slowest['seconds'] * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
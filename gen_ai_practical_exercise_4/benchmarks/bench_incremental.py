@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Re-ingesting an edited document: full ingest_text versus keyed ingest_document.
+
+Builds a document of --paragraphs paragraphs from the driving rules source
+(classwork/driving_bot/data/source.txt), ingests it, edits --edits
+paragraphs and ingests it again. For each mode reports how many chunks were
+sent to the (stub) embedding model on the second ingest, how long it took and
+how many rows the collection holds afterwards: ingest_text stores the edited
+version as a new document next to the old one, ingest_document replaces it.
+
+The chunk count is taken before the embedding cache, i.e. it is what the
+pipeline asks to embed; unchanged chunks that ingest_text re-sends are cache
+hits, but are still upserted again under new ids.
+
+Usage:
+    python benchmarks/bench_incremental.py --paragraphs 2000 --edits 1
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+SOURCE = Path(__file__).resolve().parents[2] / "classwork" / "driving_bot" / "data" / "source.txt"
+
+
+def build_document(paragraphs):
+    source = [p.strip() for p in SOURCE.read_text(encoding="utf-8").split("\n\n") if p.strip()]
+    return [source[i % len(source)] + f" ({i})" for i in range(paragraphs)]
+
+
+def edit(paragraphs, edits, seed=0):
+    edited = list(paragraphs)
+    for i in random.Random(seed).sample(range(len(edited)), edits):
+        edited[i] = edited[i] + " Pakeista."
+    return edited
+
+
+class CountingEmbeddings:
+    """Wraps ingestion.get_embeddings_async to count the texts sent for embedding."""
+
+    def __init__(self, ingestion):
+        self.count = 0
+        self._embed = ingestion.get_embeddings_async
+        ingestion.get_embeddings_async = self
+
+    async def __call__(self, texts):
+        self.count += len(texts)
+        return await self._embed(texts)
+
+
+async def run(args):
+    import ingestion
+    from database import init_db
+    from vector_db import init_chroma
+
+    init_db()
+    chroma_client = init_chroma()
+    counter = CountingEmbeddings(ingestion)
+    original = "\n\n".join(build_document(args.paragraphs))
+    edited = "\n\n".join(edit(build_document(args.paragraphs), args.edits))
+
+    for mode in ("ingest_text", "ingest_document"):
+        ingestion.resolve_collection_name = lambda topic, mode=mode: mode.replace("_", "-")
+        if mode == "ingest_text":
+            ingest = lambda text: ingestion.ingest_text(chroma_client, text, args.chunk_size, args.overlap)
+        else:
+            ingest = lambda text: ingestion.ingest_document(chroma_client, "rules.txt", text, args.chunk_size,
+                                                             args.overlap)
+        first = await ingest(original)
+        counter.count = 0
+        started = time.perf_counter()
+        second = await ingest(edited)
+        seconds = time.perf_counter() - started
+        rows = chroma_client.get_collection(second["collection_name"]).count()
+        print(f"{mode:<16} first {first['rows']:>6} rows  re-ingest embedded {counter.count:>6} chunks "
+              f"in {seconds:6.2f} s  collection rows {rows:>6}  {second.get('diff', '')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--edits", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument("--request-latency", type=float, default=0.02)
+    parser.add_argument("--per-item-latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    from stub_ollama import start_stub_ollama
+    server, url = start_stub_ollama(args.request_latency, args.per_item_latency)
+    os.environ["OLLAMA_HOST"] = url
+    os.environ["EMBEDDING_CACHE_DB"] = ":memory:"
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            asyncio.run(run(args))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
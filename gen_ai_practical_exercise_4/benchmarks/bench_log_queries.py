@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Latency of the /logs queries on a large ingestion_log table.
+
+Fills a temporary database with --rows synthetic log entries spread over
+--days, then times the first page, a deep page reached by following the
+cursor, the topic / collection / time-range filters and the hourly
+aggregate, and prints the SQLite query plan of each.
+
+Usage:
+    python benchmarks/bench_log_queries.py --rows 10000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+TOPICS = ["science", "history", "technology", "art", "sports", "general", "medicine", "law"]
+
+
+def fill(connections, rows, days):
+    start = datetime(2024, 1, 1)
+    span = days * 86400
+    rng = random.Random(0)
+    conn = connections.connection()
+    step = 200_000
+    for offset in range(0, rows, step):
+        batch = []
+        for i in range(offset, min(rows, offset + step)):
+            topic = rng.choice(TOPICS)
+            created = start + timedelta(seconds=span * i // rows)
+            batch.append((topic, topic, created.strftime("%Y-%m-%d %H:%M:%S")))
+        conn.executemany("INSERT INTO ingestion_log (topic, collection_name, creation_date) VALUES (?, ?, ?)", batch)
+        conn.commit()
+    conn.execute("ANALYZE")
+    return start
+
+
+def timed(label, fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<40} {best * 1000:9.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--pages", type=int, default=100, help="pages followed for the deep-page timing")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        import database
+        database.init_db()
+
+        started = time.perf_counter()
+        start = fill(database.connections, args.rows, args.days)
+        print(f"inserted {args.rows} rows in {time.perf_counter() - started:.1f} s")
+
+        day = lambda n: (start + timedelta(days=n)).strftime("%Y-%m-%d %H:%M:%S")
+        timed("first page", lambda: database.query_log_entries(100))
+
+        def deep_page():
+            cursor = None
+            for _ in range(args.pages):
+                _, cursor = database.query_log_entries(100, cursor)
+            return cursor
+        timed(f"{args.pages} pages via cursor (total)", deep_page, repeat=1)
+
+        timed("topic filter", lambda: database.query_log_entries(100, topic="art"))
+        timed("collection filter", lambda: database.query_log_entries(100, collection_name="law"))
+        timed("topic + time range", lambda: database.query_log_entries(100, topic="art", since=day(100), until=day(101)))
+        hourly = timed("hourly counts, 1 day", lambda: database.get_hourly_ingest_counts(day(100), day(101)))
+        timed("hourly counts, 1 day, one topic", lambda: database.get_hourly_ingest_counts(day(100), day(101), "art"))
+        print(f"hourly rows for one day: {len(hourly)}")
+
+        conn = database.connections.connection()
+        for label, sql, params in [
+            ("page", "SELECT * FROM ingestion_log WHERE creation_date <= ? AND (creation_date < ? OR id < ?) "
+                     "ORDER BY creation_date DESC, id DESC LIMIT 101", (day(200), day(200), 10)),
+            ("topic page", "SELECT * FROM ingestion_log WHERE topic = ? ORDER BY creation_date DESC, id DESC LIMIT 101", ("art",)),
+            ("hourly", "SELECT strftime('%Y-%m-%d %H:00:00', creation_date) AS hour, topic, COUNT(*) FROM ingestion_log "
+                       "WHERE creation_date >= ? AND creation_date < ? GROUP BY hour, topic", (day(100), day(101))),
+        ]:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            print(f"plan {label}: " + "; ".join(row["detail"] for row in plan))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Latency of routing a question embedding to its closest collections.
+
+Builds a CollectionRouter with --collections random centroids and times
+rank() against the previous approach of looping over the centroids in
+Python (the LLM fallback that /search used before took a gemma3 round trip,
+i.e. seconds).
+
+Usage:
+    python benchmarks/bench_routing.py --collections 10 100 1000 --top-k 3
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from routing import CollectionRouter  # noqa: E402
+
+DIMENSIONS = 768
+
+
+def loop_rank(sums, vector):
+    best_name, best_similarity = None, 0.0
+    vector_norm = np.linalg.norm(vector)
+    for name, total in sums.items():
+        similarity = float(total @ vector / (np.linalg.norm(total) * vector_norm))
+        if similarity > best_similarity:
+            best_name, best_similarity = name, similarity
+    return best_name, best_similarity
+
+
+def per_call_us(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collections", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vector = rng.standard_normal(DIMENSIONS)
+    for count in args.collections:
+        router, sums = CollectionRouter(), {}
+        for i in range(count):
+            vectors = rng.standard_normal((4, DIMENSIONS))
+            router.add(f"collection-{i}", vectors)
+            sums[f"collection-{i}"] = vectors.sum(axis=0)
+        router.rank(vector)
+        assert router.rank(vector)[0][0] == loop_rank(sums, vector)[0]
+
+        vectorized = per_call_us(lambda: router.rank(vector, args.top_k), args.repeat)
+        looped = per_call_us(lambda: loop_rank(sums, vector), max(1, args.repeat // 10))
+        print(f"{count:>6} collections  rank(k={args.top_k}) {vectorized:9.1f} us  "
+              f"python loop (k=1) {looped:9.1f} us  speedup {looped / vectorized:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Cold-start cost of the ingestion service.
+
+1. Imports main in a fresh interpreter with -X importtime and prints the
+   total plus the slowest modules by cumulative import time.
+2. Starts the app under uvicorn (against stub Ollama and Gemini servers)
+   and reports how long until /healthz first answers and until it reports
+   ready, i.e. Chroma is open and the ingestion workers are running.
+
+Usage:
+    python benchmarks/bench_startup.py --top 15
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+def import_times(workdir):
+    env = {**os.environ, "PYTHONPATH": str(APP_DIR)}
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            capture_output=True, text=True, cwd=workdir, env=env, check=True).stderr
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return times
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_health(workdir):
+    from stub_gemini import start_stub_gemini
+    from stub_ollama import start_stub_ollama
+
+    ollama_server, ollama_url = start_stub_ollama(0.0, 0.0)
+    gemini_server, gemini_url = start_stub_gemini(0.0)
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": str(APP_DIR), "OLLAMA_HOST": ollama_url, "GEMINI_BASE_URL": gemini_url,
+           "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "stub-key"), "EMBEDDING_CACHE_DB": ":memory:"}
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                               "--log-level", "warning"], cwd=workdir, env=env)
+    first_answer = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as http:
+            while ready is None and time.perf_counter() - started < 60:
+                try:
+                    health = http.get("/healthz").json()
+                except httpx.HTTPError:
+                    time.sleep(0.005)
+                    continue
+                now = time.perf_counter() - started
+                first_answer = first_answer or (now, health)
+                if health["ready"]:
+                    ready = (now, health)
+                time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+        ollama_server.shutdown()
+        gemini_server.shutdown()
+    return first_answer, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        times = import_times(workdir)
+        total = next(cumulative for cumulative, _, name in times if name.strip() == "main")
+        print(f"import main: {total / 1000:.1f} ms")
+        for cumulative, self_us, name in sorted(times, reverse=True)[:args.top]:
+            print(f"  {cumulative / 1000:8.1f} ms cumulative  {self_us / 1000:8.1f} ms self  {name}")
+        heavy = [name.strip() for _, _, name in times if name.strip() in ("chromadb", "google.genai", "ollama", "langchain")]
+        print(f"heavy SDKs imported by main: {heavy or 'none'}")
+
+        first_answer, ready = time_to_health(workdir)
+        if first_answer:
+            print(f"first /healthz answer after {first_answer[0] * 1000:.0f} ms: {first_answer[1]}")
+        if ready:
+            print(f"ready after {ready[0] * 1000:.0f} ms: {ready[1]}")
+
+
+if __name__ == "__main__":
+    main()
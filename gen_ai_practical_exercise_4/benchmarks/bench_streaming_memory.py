@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Peak memory of streaming ingestion versus loading the whole file.
+
+Generates a text file of the requested size (500 MB by default), then chunks
+it in a fresh subprocess per mode and reports peak RSS and throughput:
+
+    stream  iter_chunks_of_stream, taking PROGRESS_STEP chunks at a time
+            (optionally embedding each batch through a stub Ollama server)
+    legacy  read the whole file and call get_chunks_of_text, as /ingest does
+
+Usage:
+    python benchmarks/bench_streaming_memory.py --size-mb 500 --modes stream
+    python benchmarks/bench_streaming_memory.py --size-mb 50 --modes stream legacy --embed
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PARAGRAPH = (
+    "Vector databases store embeddings of text chunks so that similar passages can be found "
+    "by nearest-neighbour search. Chunk size and overlap decide how much context each passage "
+    "carries and how much text is repeated between neighbouring chunks. "
+)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_corpus(path, size_mb):
+    block = "".join(f"{i}. {PARAGRAPH * (1 + i % 5)}\n\n" for i in range(2000)).encode("utf-8")
+    target = size_mb * 1024 * 1024
+    with open(path, "wb") as f:
+        written = 0
+        while written < target:
+            f.write(block[:target - written])
+            written += len(block)
+
+
+def run_mode(mode, path, chunk_size, overlap, embed):
+    if embed:
+        from stub_ollama import start_stub_ollama
+        server, url = start_stub_ollama(0.0, 0.0)
+        os.environ["OLLAMA_HOST"] = url
+        os.environ["EMBEDDING_CACHE_DB"] = ":memory:"
+        from embedding import get_embeddings
+    from ingestion import PROGRESS_STEP, _take
+    from text_processing import get_chunks_of_text, iter_chunks_of_stream
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    count = 0
+    if mode == "stream":
+        with open(path, encoding="utf-8") as stream:
+            chunks = iter_chunks_of_stream(stream, chunk_size, overlap)
+            while batch := _take(chunks, PROGRESS_STEP):
+                if embed:
+                    get_embeddings(batch)
+                count += len(batch)
+    else:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        chunks = [chunk.page_content for chunk in get_chunks_of_text(text, chunk_size, overlap)]
+        for start in range(0, len(chunks), PROGRESS_STEP):
+            if embed:
+                get_embeddings(chunks[start:start + PROGRESS_STEP])
+        count = len(chunks)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "chunks": count,
+        "seconds": elapsed,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument("--file", help="use an existing text file instead of generating one")
+    parser.add_argument("--modes", nargs="+", choices=["stream", "legacy"], default=["stream"])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument("--embed", action="store_true", help="embed every batch through a stub Ollama server")
+    parser.add_argument("--run", choices=["stream", "legacy"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_mode(args.run, args.file, args.chunk_size, args.overlap, args.embed)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = args.file
+        if path is None:
+            path = os.path.join(workdir, "corpus.txt")
+            write_corpus(path, args.size_mb)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"file: {size_mb:.0f} MB, chunk_size={args.chunk_size}, overlap={args.overlap}, embed={args.embed}")
+        for mode in args.modes:
+            command = [sys.executable, __file__, "--run", mode, "--file", path,
+                       "--chunk-size", str(args.chunk_size), "--overlap", str(args.overlap)]
+            if args.embed:
+                command.append("--embed")
+            output = subprocess.run(command, capture_output=True, text=True, cwd=workdir, check=True).stdout
+            stats = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<7} {stats['chunks']:>9} chunks  {stats['seconds']:8.1f} s  "
+                  f"{size_mb / stats['seconds']:7.1f} MB/s  "
+                  f"peak RSS {stats['peak_rss_mb']:8.1f} MB (after imports {stats['baseline_rss_mb']:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
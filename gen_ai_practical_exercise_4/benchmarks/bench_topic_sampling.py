@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Topic agreement and latency: full-text prompt versus the bounded topic sample.
+
+For every .txt file in the reference corpus, the topic is detected twice with
+gemma3: once from the whole text (the old behaviour) and once from
+build_topic_sample over the document's chunks. Reports how often both agree
+and the latency of each. Needs a running Ollama with gemma3 and
+nomic-embed-text, unless --stub is given (which only exercises the harness).
+
+Usage:
+    python benchmarks/bench_topic_sampling.py --corpus path/to/corpus --token-budget 1500
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / "classwork" / "driving_bot" / "data"
+
+
+async def compare(path, args):
+    from embedding import get_embeddings
+    from text_processing import estimate_tokens, get_chunks_of_text, sanitize_topic
+    from topic_modeling import build_topic_sample, get_topic_async
+
+    text = path.read_text(encoding="utf-8", errors="replace")
+    chunks_text = [chunk.page_content for chunk in get_chunks_of_text(text, args.chunk_size, args.overlap)]
+    embeddings = get_embeddings(chunks_text)
+
+    started = time.perf_counter()
+    full_topic = await get_topic_async(text)
+    full_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sample = build_topic_sample(chunks_text, embeddings, args.token_budget)
+    sample_topic = await get_topic_async(sample)
+    sample_seconds = time.perf_counter() - started
+
+    agree = sanitize_topic(full_topic).lower() == sanitize_topic(sample_topic).lower()
+    print(f"{path.name[:30]:<30} {estimate_tokens(text):>9} {estimate_tokens(sample):>7} "
+          f"{full_seconds:8.2f} s {sample_seconds:8.2f} s  {'=' if agree else '!'} "
+          f"{full_topic[:20]!r} / {sample_topic[:20]!r}")
+    return agree, full_seconds, sample_seconds
+
+
+async def main_async(args):
+    files = sorted(Path(args.corpus).glob("*.txt"))
+    if not files:
+        sys.exit(f"No .txt files in {args.corpus}")
+    print(f"{'document':<30} {'tokens':>9} {'sample':>7} {'full':>10} {'sampled':>10}")
+    results = [await compare(path, args) for path in files]
+    agreement = sum(agree for agree, _, _ in results) / len(results)
+    full = sum(seconds for _, seconds, _ in results)
+    sampled = sum(seconds for _, _, seconds in results)
+    print(f"agreement {agreement:.0%}  total full {full:.2f} s  total sampled {sampled:.2f} s  "
+          f"speedup {full / sampled:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="directory of .txt reference documents")
+    parser.add_argument("--token-budget", type=int, default=1500)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument("--stub", action="store_true", help="run against the stub Ollama server")
+    args = parser.parse_args()
+
+    os.environ.setdefault("EMBEDDING_CACHE_DB", ":memory:")
+    if args.stub:
+        from stub_ollama import start_stub_ollama
+        _, url = start_stub_ollama(0.05, 0.01)
+        os.environ["OLLAMA_HOST"] = url
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
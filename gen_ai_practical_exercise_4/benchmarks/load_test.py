@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Load test for /search against stubbed Ollama and Gemini servers.
+
+Runs the FastAPI app in-process in a scratch directory, ingests one document
+and then fires /search requests from 1, 8 and 32 concurrent clients,
+reporting p50/p99 latency and throughput for each level.
+
+Usage:
+    python benchmarks/load_test.py --requests-per-client 8 --gemini-latency 0.3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from stub_gemini import start_stub_gemini
+from stub_ollama import start_stub_ollama
+
+
+async def client_loop(http, client_id, requests_per_client, latencies):
+    for i in range(requests_per_client):
+        started = time.perf_counter()
+        response = await http.get("/search", params={"question": f"Question {client_id}-{i}: what about software and computers?"})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_level(http, concurrency, requests_per_client):
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(http, c, requests_per_client, latencies) for c in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(f"{concurrency:>4} clients  {len(latencies):>5} requests  "
+          f"p50 {percentiles[49] * 1000:8.1f} ms  p99 {percentiles[98] * 1000:8.1f} ms  "
+          f"{len(latencies) / elapsed:8.1f} req/s")
+
+
+async def main_async(args):
+    import httpx
+    import main
+    from topic_modeling import topic_resolver
+
+    topic_resolver.threshold = args.topic_threshold
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app), \
+            httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as http:
+        response = await http.post("/ingest", data={"text": "Software and computers. " * 400})
+        response.raise_for_status()
+        status_url = response.json()["status_url"]
+        while (await http.get(status_url)).json()["status"] in ("queued", "running"):
+            await asyncio.sleep(0.05)
+        for concurrency in args.concurrency:
+            await run_level(http, concurrency, args.requests_per_client)
+        print("topics:", (await http.get("/stats")).json()["topics"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests-per-client", type=int, default=8)
+    parser.add_argument("--ollama-latency", type=float, default=0.05, help="stub overhead per Ollama request (s)")
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="stub latency per Gemini request (s)")
+    parser.add_argument("--topic-threshold", type=float, default=0.3,
+                        help="centroid similarity needed to skip the topic LLM call (stub embeddings are bag-of-words)")
+    args = parser.parse_args()
+
+    ollama_server, ollama_url = start_stub_ollama(args.ollama_latency, 0.001)
+    gemini_server, gemini_url = start_stub_gemini(args.gemini_latency)
+    os.environ.update({
+        "OLLAMA_HOST": ollama_url,
+        "GEMINI_BASE_URL": gemini_url,
+        "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "stub-key"),
+        "EMBEDDING_CACHE_DB": ":memory:",
+    })
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        asyncio.run(main_async(args))
+
+    ollama_server.shutdown()
+    gemini_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Local stand-in for the Gemini generateContent REST endpoints.
+
+Point the API at it with GEMINI_BASE_URL=<url>. generateContent sleeps for a
+fixed latency and answers with a canned Lithuanian response.
+streamGenerateContent answers as server-sent events: either the canned
+response split into words (first chunk after `latency`, then one every
+`token_interval`), or a stream recorded from the real API with
+record_stream, replayed with its original timing.
+
+Record a stream (needs GOOGLE_API_KEY) and serve it:
+    python benchmarks/stub_gemini.py --record stream.jsonl --prompt "Kas yra RAG?"
+    python benchmarks/stub_gemini.py --replay stream.jsonl
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def load_recording(path: str):
+    """Read a recorded stream: one JSON object per line with "delay" (seconds after the previous chunk) and "data"."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def record_stream(prompt: str, path: str, model: str = "models/gemini-1.5-flash"):
+    """Stream an answer from the real Gemini API and save every chunk with its arrival delay."""
+    import os
+    import google.genai as genai
+
+    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+    previous = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in client.models.generate_content_stream(model=model, contents=prompt):
+            now = time.perf_counter()
+            data = chunk.model_dump(mode="json", by_alias=True, exclude_none=True)
+            f.write(json.dumps({"delay": round(now - previous, 4), "data": data}, ensure_ascii=False) + "\n")
+            previous = now
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    latency = 0.3
+    token_interval = 0.05
+    answer = "Tai yra bandomasis atsakymas."
+    recording = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @staticmethod
+    def _chunk(text, finish_reason=None):
+        candidate = {"content": {"role": "model", "parts": [{"text": text}]}}
+        if finish_reason:
+            candidate["finishReason"] = finish_reason
+        return {"candidates": [candidate]}
+
+    def _stream_events(self):
+        if self.recording is not None:
+            for event in self.recording:
+                yield event["delay"], event["data"]
+            return
+        words = self.answer.split(" ")
+        for i, word in enumerate(words):
+            text = word if i == len(words) - 1 else word + " "
+            yield (self.latency if i == 0 else self.token_interval), \
+                self._chunk(text, "STOP" if i == len(words) - 1 else None)
+
+    def _send_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for delay, data in self._stream_events():
+            time.sleep(delay)
+            self.wfile.write(f"data: {json.dumps(data, ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+        self.close_connection = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        path = self.path.split("?")[0]
+        if path.endswith(":streamGenerateContent"):
+            self._send_stream()
+            return
+        if not path.endswith(":generateContent"):
+            self._send_json({"error": {"code": 404, "message": f"unknown path {self.path}"}}, status=404)
+            return
+        time.sleep(self.latency)
+        self._send_json(self._chunk(self.answer, "STOP"))
+
+
+def start_stub_gemini(latency: float = 0.3, port: int = 0, token_interval: float = 0.05, recording=None):
+    """
+    Start the stub server on a background thread.
+
+    Args:
+        recording: Chunks from load_recording to replay on streamGenerateContent.
+
+    Returns:
+        Tuple of (server, base_url). Call server.shutdown() when done.
+    """
+    handler = type("ConfiguredStubGeminiHandler", (StubGeminiHandler,), {
+        "latency": latency,
+        "token_interval": token_interval,
+        "recording": recording,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--replay", help="recorded stream to serve on streamGenerateContent")
+    parser.add_argument("--record", help="record a real stream to this file and exit")
+    parser.add_argument("--prompt", default="Kas yra vektorinė duomenų bazė?")
+    args = parser.parse_args()
+
+    if args.record:
+        record_stream(args.prompt, args.record)
+    else:
+        server, url = start_stub_gemini(port=args.port, recording=load_recording(args.replay) if args.replay else None)
+        print(f"Stub Gemini listening on {url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,105 @@
+"""
+Local stand-in for the Ollama HTTP API used by the benchmarks.
+
+Embeddings are bag-of-words vectors: every word maps to a fixed pseudo-random
+vector and a text embeds to the normalized sum of its words, so texts that
+share vocabulary are similar. Every request sleeps for a fixed overhead plus
+a per-input cost (per embedded text, or per 1000 prompt characters for
+generate) so that the effect of batching, concurrency and prompt size is
+visible without a real model.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+EMBEDDING_DIMENSIONS = 768
+
+
+@lru_cache(maxsize=100_000)
+def _word_vector(word: str):
+    seed = int.from_bytes(hashlib.sha256(word.encode("utf-8")).digest()[:8], "big")
+    return np.random.default_rng(seed).standard_normal(EMBEDDING_DIMENSIONS)
+
+
+def fake_embedding(text: str):
+    words = re.findall(r"\w+", text.lower()) or [""]
+    vector = np.sum([_word_vector(word) for word in words], axis=0)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    request_latency = 0.02
+    per_item_latency = 0.002
+    generate_response = "Technology"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path == "/api/embeddings":
+            time.sleep(self.request_latency + self.per_item_latency)
+            self._send_json({"embedding": fake_embedding(request.get("prompt", ""))})
+        elif self.path == "/api/embed":
+            inputs = request.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            time.sleep(self.request_latency + self.per_item_latency * len(inputs))
+            self._send_json({
+                "model": request.get("model", ""),
+                "embeddings": [fake_embedding(text) for text in inputs],
+            })
+        elif self.path == "/api/generate":
+            time.sleep(self.request_latency + self.per_item_latency * len(request.get("prompt", "")) / 1000)
+            self._send_json({
+                "model": request.get("model", ""),
+                "response": self.generate_response,
+                "done": True,
+            })
+        else:
+            self._send_json({"error": f"unknown path {self.path}"}, status=404)
+
+
+def start_stub_ollama(request_latency: float = 0.02, per_item_latency: float = 0.002, port: int = 0):
+    """
+    Start the stub server on a background thread.
+
+    Returns:
+        Tuple of (server, base_url). Call server.shutdown() when done.
+    """
+    handler = type("ConfiguredStubOllamaHandler", (StubOllamaHandler,), {
+        "request_latency": request_latency,
+        "per_item_latency": per_item_latency,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    server, url = start_stub_ollama(port=11434)
+    print(f"Stub Ollama listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
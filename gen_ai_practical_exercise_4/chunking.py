@@ -1,14 +1,5 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+from text_processing import get_chunks_of_text as _get_chunks_of_text
 
 
 def get_chunks_of_text(text:str):
-    document = Document(page_content=text)
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size = 750,
-        chunk_overlap = 100
-    )
-
-    chunks = splitter.split_documents(documents=[document])
-
-    return chunks
\ No newline at end of file
+    return _get_chunks_of_text(text, chunk_size=750, chunk_overlap=100)
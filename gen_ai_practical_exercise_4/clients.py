@@ -0,0 +1,40 @@
+import os
+import threading
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _get_or_create(name: str, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def _create_chroma_client():
+    from vector_db import init_chroma
+    return init_chroma()
+
+
+def _create_gemini_client():
+    import google.genai as genai
+    base_url = os.getenv("GEMINI_BASE_URL")
+    return genai.Client(api_key=os.getenv("GOOGLE_API_KEY"), http_options={"base_url": base_url} if base_url else None)
+
+
+def get_chroma_client():
+    """The shared Chroma PersistentClient, opened (and chromadb imported) on first use."""
+    return _get_or_create("chroma", _create_chroma_client)
+
+
+def get_gemini_client():
+    """The shared google.genai client, created (and the SDK imported) on first use."""
+    return _get_or_create("gemini", _create_gemini_client)
+
+
+def loaded_clients():
+    return sorted(_clients)
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Maximum number of in-flight calls per external dependency.
+DEPENDENCY_LIMITS = {
+    "ollama": 4,
+    "gemini": 8,
+    "chroma": 8,
+    "sqlite": 4,
+    "files": 4,
+    "cpu": os.cpu_count() or 2,
+}
+
+# Threads for the dependencies that only have blocking clients (Chroma, SQLite),
+# file IO and CPU-bound work such as chunking.
+BLOCKING_WORKERS = sum(DEPENDENCY_LIMITS[name] for name in ("chroma", "sqlite", "files", "cpu"))
+
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+_limiters = weakref.WeakKeyDictionary()
+_ollama_clients = weakref.WeakKeyDictionary()
+
+
+def limit(dependency: str) -> asyncio.Semaphore:
+    """Semaphore bounding concurrent calls to a dependency on the running event loop."""
+    loop = asyncio.get_running_loop()
+    limiters = _limiters.setdefault(loop, {})
+    if dependency not in limiters:
+        limiters[dependency] = asyncio.Semaphore(DEPENDENCY_LIMITS[dependency])
+    return limiters[dependency]
+
+
+async def run_blocking(dependency: str, fn, *args, **kwargs):
+    """Run a blocking call on the shared executor without holding up the event loop."""
+    async with limit(dependency):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+
+def ollama_async_client():
+    """One ollama.AsyncClient per event loop, so its connection pool is never shared across loops."""
+    loop = asyncio.get_running_loop()
+    client = _ollama_clients.get(loop)
+    if client is None:
+        from ollama import AsyncClient
+        client = _ollama_clients[loop] = AsyncClient()
+    return client
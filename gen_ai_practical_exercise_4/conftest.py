@@ -0,0 +1,18 @@
+import pytest
+
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """The database module pointed at a fresh ingestion log in tmp_path."""
+    path = str(tmp_path / "ingestion_log.db")
+    manager = database.ConnectionManager(path)
+    monkeypatch.setattr(database, "DATABASE_NAME", path)
+    monkeypatch.setattr(database, "connections", manager)
+    writer = database.LogWriter(manager)
+    monkeypatch.setattr(database, "log_writer", writer)
+    database.init_db()
+    yield database
+    writer.flush()
+    manager.close_all()
@@ -0,0 +1,168 @@
+import threading
+from text_processing import estimate_tokens
+
+# Estimated tokens of retrieved text put into the answer prompt.
+CONTEXT_TOKEN_BUDGET = 1500
+CONTEXT_SEPARATOR = "\n\n"
+# Shorter common text between the end of a chunk and the start of the next
+# one is treated as a coincidence rather than chunk overlap.
+MIN_OVERLAP_CHARS = 16
+
+
+def merge_overlapping(first: str, second: str) -> str:
+    """Join two consecutive chunks, dropping the longest suffix of first that second starts with."""
+    probe = second[:MIN_OVERLAP_CHARS]
+    position = first.find(probe, max(0, len(first) - len(second)))
+    while len(probe) == MIN_OVERLAP_CHARS and position != -1:
+        if second.startswith(first[position:]):
+            return first + second[len(first) - position:]
+        position = first.find(probe, position + 1)
+    return first + "\n" + second
+
+
+def trim_to_tokens(text: str, tokens: int) -> str:
+    """Cut text to at most tokens estimated tokens, at the last separator in the second half of the cut."""
+    limit = 4 * max(tokens, 0)
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    for separator in (CONTEXT_SEPARATOR, "\n", " "):
+        position = cut.rfind(separator)
+        if position >= limit // 2:
+            return cut[:position].rstrip()
+    return cut
+
+
+class ContextPacker:
+    """
+    Turns retrieved chunks into a compact prompt context.
+
+    Chunks of the same document with consecutive chunk_index values are
+    merged into one span with their overlapping text removed, and duplicate
+    texts are dropped. Spans are ranked by their best (smallest) distance
+    and added while they fit in token_budget, as estimated by
+    estimate_tokens. A span that does not fit is cut back to the run of its
+    chunks around the best one that does; the top-ranked span is always
+    used, trimmed at a separator if even its best chunk is over the budget.
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_in = 0
+        self.tokens_saved = 0
+        self.tokens_cut = 0
+
+    def _spans(self, matches):
+        groups, spans = {}, []
+        for match in matches:
+            metadata = match.get("metadata") or {}
+            if "document_id" in metadata and "chunk_index" in metadata:
+                groups.setdefault((match["collection"], metadata["document_id"]), []).append(match)
+            else:
+                spans.append({"text": match["document"], "distance": match["distance"], "chunks": [match]})
+
+        for group in groups.values():
+            group.sort(key=lambda match: match["metadata"]["chunk_index"])
+            span, previous_index = None, None
+            for match in group:
+                index = match["metadata"]["chunk_index"]
+                if span is not None and index == previous_index:
+                    continue
+                if span is not None and index == previous_index + 1:
+                    span["text"] = merge_overlapping(span["text"], match["document"])
+                    span["distance"] = min(span["distance"], match["distance"])
+                    span["chunks"].append(match)
+                else:
+                    span = {"text": match["document"], "distance": match["distance"], "chunks": [match]}
+                    spans.append(span)
+                previous_index = index
+        return sorted(spans, key=lambda span: span["distance"])
+
+    @staticmethod
+    def _fit(span, budget, trim):
+        """
+        The longest run of the span's chunks around its best one that fits in
+        budget, growing towards the closer neighbour first. None if even the
+        best chunk does not fit, unless trim is set.
+        """
+        chunks = span["chunks"]
+        low = high = min(range(len(chunks)), key=lambda i: chunks[i]["distance"])
+        text = chunks[low]["document"]
+        if estimate_tokens(text) > budget:
+            return trim_to_tokens(text, budget) if trim else None
+        while True:
+            candidates = []
+            if low > 0:
+                candidates.append((chunks[low - 1]["distance"], low - 1, high,
+                                   merge_overlapping(chunks[low - 1]["document"], text)))
+            if high < len(chunks) - 1:
+                candidates.append((chunks[high + 1]["distance"], low, high + 1,
+                                   merge_overlapping(text, chunks[high + 1]["document"])))
+            fitting = [candidate for candidate in sorted(candidates, key=lambda candidate: candidate[0])
+                       if estimate_tokens(candidate[3]) <= budget]
+            if not fitting:
+                return text
+            _, low, high, text = fitting[0]
+
+    def pack(self, matches):
+        """
+        Build the context from federated_query matches.
+
+        Returns:
+            Tuple of (context text, report) where the report has the chunk and span
+            counts, the estimated tokens of the raw chunks and of the packed
+            context, the tokens saved by merging overlaps and dropping
+            duplicates, and the tokens cut to fit the budget.
+        """
+        selected, seen, used, unique, trimmed = [], set(), 0, 0, 0
+        spans = self._spans(matches)
+        for span in spans:
+            if span["text"] in seen:
+                continue
+            seen.add(span["text"])
+            cost = estimate_tokens(span["text"])
+            unique += cost
+            text = span["text"]
+            if used + cost > self.token_budget:
+                text = self._fit(span, self.token_budget - used, trim=not selected)
+                if not text:
+                    continue
+                trimmed += 1
+            selected.append(text)
+            used += estimate_tokens(text)
+
+        tokens_in = sum(estimate_tokens(match["document"]) for match in matches)
+        tokens_saved = max(tokens_in - unique, 0)
+        tokens_cut = unique - used
+        context = CONTEXT_SEPARATOR.join(selected)
+        tokens_out = estimate_tokens(context) if context else 0
+        with self._lock:
+            self.requests += 1
+            self.tokens_in += tokens_in
+            self.tokens_saved += tokens_saved
+            self.tokens_cut += tokens_cut
+        return context, {
+            "chunks": len(matches),
+            "spans": len(spans),
+            "spans_used": len(selected),
+            "spans_trimmed": trimmed,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "tokens_saved": tokens_saved,
+            "tokens_cut": tokens_cut,
+        }
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "token_budget": self.token_budget,
+            "tokens_in": self.tokens_in,
+            "tokens_saved": self.tokens_saved,
+            "tokens_cut": self.tokens_cut,
+            "saved_rate": self.tokens_saved / self.tokens_in if self.tokens_in else 0.0,
+        }
+
+
+context_packer = ContextPacker()
@@ -1,10 +1,109 @@
+import atexit
+import base64
+import json
+import queue
 import sqlite3
-from datetime import datetime
+import threading
+import traceback
+from datetime import datetime, timezone
 
 DATABASE_NAME = "ingestion_log.db"
+# Log entries written by the background writer in one transaction at most,
+# and how long it waits for more entries before writing a partial batch.
+LOG_BATCH_SIZE = 500
+LOG_FLUSH_INTERVAL = 0.05
+
+
+class ConnectionManager:
+    """
+    One SQLite connection per thread, opened on first use and reused after.
+
+    Connections run in WAL mode, so readers do not block the writer, and
+    with a busy timeout instead of failing with "database is locked".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class LogWriter:
+    """Background thread that inserts queued log entries in batched transactions."""
+
+    def __init__(self, manager: ConnectionManager):
+        self.manager = manager
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add(self, topic: str, collection_name: str):
+        created = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        self._queue.put((topic, collection_name, created))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                    self._thread.start()
+
+    def flush(self):
+        """Block until every queued entry has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < LOG_BATCH_SIZE:
+                    batch.append(self._queue.get(timeout=LOG_FLUSH_INTERVAL))
+            except queue.Empty:
+                pass
+            conn = None
+            try:
+                # Inside the try, so that a failure to connect loses this batch
+                # but neither kills the thread nor leaves flush() waiting forever.
+                conn = self.manager.connection()
+                conn.executemany(
+                    "INSERT INTO ingestion_log (topic, collection_name, creation_date) VALUES (?, ?, ?)",
+                    batch,
+                )
+                conn.commit()
+            except Exception:
+                if conn is not None:
+                    conn.rollback()
+                traceback.print_exc()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+connections = ConnectionManager(DATABASE_NAME)
+log_writer = LogWriter(connections)
+atexit.register(log_writer.flush)
 
 def init_db():
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = connections.connection()
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS ingestion_log (
@@ -14,23 +113,223 @@ def init_db():
             creation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    # Keyset pagination walks (creation_date, id) newest first, optionally
+    # within one topic or collection; each access path has its own index.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_log_date_id ON ingestion_log (creation_date, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_log_topic_date_id ON ingestion_log (topic, creation_date, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_log_collection_date_id ON ingestion_log (collection_name, creation_date, id)")
+    init_jobs_table(cursor)
+    init_manifest_tables(cursor)
     conn.commit()
-    conn.close()
 
 def add_log_entry(topic: str, collection_name: str):
-    conn = sqlite3.connect(DATABASE_NAME)
+    log_writer.add(topic, collection_name)
+
+def encode_log_cursor(entry) -> str:
+    raw = json.dumps([entry["creation_date"], entry["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_log_cursor(cursor: str):
+    try:
+        creation_date, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(creation_date), int(entry_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def query_log_entries(limit: int = 100, cursor: str = None, topic: str = None, collection_name: str = None,
+                      since: str = None, until: str = None):
+    """
+    One page of log entries, newest first, using keyset pagination on (creation_date, id).
+
+    Args:
+        cursor: next_cursor returned with the previous page.
+        since, until: Inclusive / exclusive bounds on creation_date ("YYYY-MM-DD HH:MM:SS", UTC).
+
+    Returns:
+        Tuple of (entries, next_cursor); next_cursor is None on the last page.
+    """
+    log_writer.flush()
+    conditions, params = [], []
+    if topic is not None:
+        conditions.append("topic = ?")
+        params.append(topic)
+    if collection_name is not None:
+        conditions.append("collection_name = ?")
+        params.append(collection_name)
+    if since is not None:
+        conditions.append("creation_date >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("creation_date < ?")
+        params.append(until)
+    if cursor is not None:
+        creation_date, entry_id = decode_log_cursor(cursor)
+        conditions.append("creation_date <= ? AND (creation_date < ? OR id < ?)")
+        params.extend([creation_date, creation_date, entry_id])
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = connections.connection().execute(
+        f"SELECT * FROM ingestion_log {where} ORDER BY creation_date DESC, id DESC LIMIT ?",
+        (*params, limit + 1),
+    ).fetchall()
+    entries = [dict(row) for row in rows[:limit]]
+    next_cursor = encode_log_cursor(entries[-1]) if len(rows) > limit else None
+    return entries, next_cursor
+
+def get_log_entries(limit: int = 100):
+    """The newest limit log entries; the first page of query_log_entries."""
+    return query_log_entries(limit)[0]
+
+def get_hourly_ingest_counts(since: str, until: str = None, topic: str = None, collection_name: str = None):
+    """Number of ingests per topic per hour in [since, until), computed in SQL."""
+    log_writer.flush()
+    conditions, params = ["creation_date >= ?"], [since]
+    if until is not None:
+        conditions.append("creation_date < ?")
+        params.append(until)
+    if topic is not None:
+        conditions.append("topic = ?")
+        params.append(topic)
+    if collection_name is not None:
+        conditions.append("collection_name = ?")
+        params.append(collection_name)
+    rows = connections.connection().execute(f"""
+        SELECT strftime('%Y-%m-%d %H:00:00', creation_date) AS hour, topic, COUNT(*) AS ingests
+        FROM ingestion_log
+        WHERE {' AND '.join(conditions)}
+        GROUP BY hour, topic
+        ORDER BY hour, topic
+    """, params).fetchall()
+    return [dict(row) for row in rows]
+
+JOB_FIELDS = (
+    "status", "stage", "topic", "collection_name", "chunks_total",
+    "chunks_embedded", "stage_timings", "result", "error", "text",
+    "source_path", "bytes_read", "bytes_total",
+)
+
+def init_jobs_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingestion_jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            stage TEXT,
+            text TEXT,
+            source_path TEXT,
+            document_id TEXT,
+            chunk_size INTEGER NOT NULL,
+            overlap INTEGER NOT NULL,
+            metadata TEXT,
+            topic TEXT,
+            collection_name TEXT,
+            chunks_total INTEGER,
+            chunks_embedded INTEGER NOT NULL DEFAULT 0,
+            bytes_read INTEGER,
+            bytes_total INTEGER,
+            stage_timings TEXT,
+            result TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(ingestion_jobs)")}
+    for column in ("source_path", "document_id", "document_key"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE ingestion_jobs ADD COLUMN {column} TEXT")
+    for column in ("bytes_read", "bytes_total"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE ingestion_jobs ADD COLUMN {column} INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs (status)")
+
+def create_job(job_id: str, text: str, chunk_size: int, overlap: int, metadata: str = None,
+               source_path: str = None, document_id: str = None, document_key: str = None):
+    conn = connections.connection()
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO ingestion_log (topic, collection_name) VALUES (?, ?)
-    """, (topic, collection_name))
+        INSERT INTO ingestion_jobs (id, status, stage, text, chunk_size, overlap, metadata, source_path, document_id,
+                                    document_key)
+        VALUES (?, 'queued', 'queued', ?, ?, ?, ?, ?, ?, ?)
+    """, (job_id, text, chunk_size, overlap, metadata, source_path, document_id, document_key))
     conn.commit()
-    conn.close()
 
-def get_log_entries(limit: int = 100):
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row
+def update_job(job_id: str, **fields):
+    unknown = set(fields) - set(JOB_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = connections.connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM ingestion_log ORDER BY creation_date DESC LIMIT ?", (limit,))
-    entries = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return entries
+    cursor.execute(f"""
+        UPDATE ingestion_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+    """, (*fields.values(), job_id))
+    conn.commit()
+
+def get_job(job_id: str):
+    cursor = connections.connection().cursor()
+    cursor.execute("SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,))
+    row = cursor.fetchone()
+    return dict(row) if row else None
+
+def get_unfinished_job_ids():
+    cursor = connections.connection().cursor()
+    cursor.execute("SELECT id FROM ingestion_jobs WHERE status IN ('queued', 'running') ORDER BY created_at")
+    return [row[0] for row in cursor.fetchall()]
+
+def init_manifest_tables(cursor):
+    """Per-document chunk manifests used by incremental ingestion."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS documents (
+            document_key TEXT PRIMARY KEY,
+            collection_name TEXT NOT NULL,
+            metadata TEXT,
+            chunk_count INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS document_chunks (
+            document_key TEXT NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            chunk_id TEXT NOT NULL,
+            chunk_hash TEXT NOT NULL,
+            PRIMARY KEY (document_key, chunk_index)
+        )
+    """)
+
+def get_document_manifest(document_key: str):
+    """
+    The stored manifest of a document, or None if it was never ingested incrementally.
+
+    Returns:
+        Dict with collection_name, metadata (JSON text), chunk_count and chunks,
+        a list of {chunk_index, chunk_id, chunk_hash} in document order.
+    """
+    conn = connections.connection()
+    row = conn.execute("SELECT * FROM documents WHERE document_key = ?", (document_key,)).fetchone()
+    if row is None:
+        return None
+    chunks = conn.execute(
+        "SELECT chunk_index, chunk_id, chunk_hash FROM document_chunks WHERE document_key = ? ORDER BY chunk_index",
+        (document_key,),
+    ).fetchall()
+    return {**dict(row), "chunks": [dict(chunk) for chunk in chunks]}
+
+def save_document_manifest(document_key: str, collection_name: str, metadata: str, chunks):
+    """Replace the manifest of a document; chunks are (chunk_index, chunk_id, chunk_hash) tuples."""
+    conn = connections.connection()
+    with conn:
+        conn.execute("""
+            INSERT INTO documents (document_key, collection_name, metadata, chunk_count, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (document_key) DO UPDATE SET
+                collection_name = excluded.collection_name,
+                metadata = excluded.metadata,
+                chunk_count = excluded.chunk_count,
+                updated_at = excluded.updated_at
+        """, (document_key, collection_name, metadata, len(chunks)))
+        conn.execute("DELETE FROM document_chunks WHERE document_key = ?", (document_key,))
+        conn.executemany(
+            "INSERT INTO document_chunks (document_key, chunk_index, chunk_id, chunk_hash) VALUES (?, ?, ?, ?)",
+            [(document_key, *chunk) for chunk in chunks],
+        )
@@ -1,11 +1,95 @@
-from ollama import embeddings
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrency import limit, ollama_async_client, run_blocking
+from embedding_cache import get_embedding_cache, normalize_text
+
+EMBEDDING_MODEL = 'nomic-embed-text'
+# Model and endpoint the vectors come from: /api/embed returns unit-length
+# vectors, the legacy /api/embeddings did not. Keys the embedding cache and
+# marks the Chroma collections holding such vectors.
+EMBEDDING_KEY = f'{EMBEDDING_MODEL}/api/embed'
+EMBED_BATCH_SIZE = 32
+EMBED_MAX_CONCURRENCY = 4
+
+_client = None
+_client_lock = threading.Lock()
+
+def _sync_client():
+    # Created on first use so that importing this module does not load ollama.
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from ollama import Client
+                _client = Client()
+    return _client
+
+def _embed_batch(batch):
+    return _sync_client().embed(model=EMBEDDING_MODEL, input=batch).embeddings
+
+async def _embed_batch_async(batch):
+    async with limit("ollama"):
+        response = await ollama_async_client().embed(model=EMBEDDING_MODEL, input=batch)
+    return response.embeddings
+
+def _batches(texts, batch_size):
+    return [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+def _embed_uncached(texts, batch_size, max_concurrency):
+    batches = _batches(texts, batch_size)
+    if len(batches) <= 1 or max_concurrency <= 1:
+        results = map(_embed_batch, batches)
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as executor:
+            results = list(executor.map(_embed_batch, batches))
+    return [vector for batch in results for vector in batch]
+
+def _find_missing(texts, vectors):
+    missing = {}
+    for text, vector in zip(texts, vectors):
+        if vector is None:
+            missing.setdefault(normalize_text(text), text)
+    return missing
+
+def _fill_missing(texts, vectors, missing, computed):
+    by_text = dict(zip(missing, computed))
+    return [vector if vector is not None else by_text[normalize_text(text)]
+            for text, vector in zip(texts, vectors)]
 
 def get_embedding(fact):
-    return embeddings(model='nomic-embed-text', prompt=fact)
+    # Goes through the same /api/embed endpoint as get_embeddings so that
+    # stored chunks and search questions live in the same vector space.
+    from ollama import EmbeddingsResponse
+    return EmbeddingsResponse(embedding=get_embeddings([fact])[0])
+
+def get_embeddings(prompt_list, batch_size: int = EMBED_BATCH_SIZE, max_concurrency: int = EMBED_MAX_CONCURRENCY):
+    """
+    Embed a list of texts, returning one vector per text in input order.
 
-def get_embeddings(prompt_list):
-    result = []
-    for fact in prompt_list:
-        result.append(get_embedding(fact))
-    return result
+    Texts already in the embedding cache are not sent to Ollama; the rest are
+    de-duplicated and embedded in batches of batch_size, with up to
+    max_concurrency batches in flight.
+    """
+    texts = list(prompt_list)
+    embedding_cache = get_embedding_cache()
+    vectors = embedding_cache.get_many(EMBEDDING_KEY, texts)
+    missing = _find_missing(texts, vectors)
+    if missing:
+        computed = _embed_uncached(list(missing.values()), batch_size, max_concurrency)
+        embedding_cache.put_many(EMBEDDING_KEY, missing.values(), computed)
+        vectors = _fill_missing(texts, vectors, missing, computed)
+    return vectors
 
+async def get_embeddings_async(prompt_list, batch_size: int = EMBED_BATCH_SIZE):
+    """Asynchronous get_embeddings; the number of batches in flight is bounded by the "ollama" limit."""
+    texts = list(prompt_list)
+    embedding_cache = await run_blocking("sqlite", get_embedding_cache)
+    vectors = await run_blocking("sqlite", embedding_cache.get_many, EMBEDDING_KEY, texts)
+    missing = _find_missing(texts, vectors)
+    if missing:
+        results = await asyncio.gather(*map(_embed_batch_async, _batches(list(missing.values()), batch_size)))
+        computed = [vector for batch in results for vector in batch]
+        await run_blocking("sqlite", embedding_cache.put_many, EMBEDDING_KEY, list(missing.values()), computed)
+        vectors = _fill_missing(texts, vectors, missing, computed)
+    return vectors
@@ -0,0 +1,154 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# Duplicated in classwork/driving_bot/modules/embedding_cache.py; change both copies together
+# (gen_ai_practical_exercise_4/test_embedding_cache.py checks they match).
+CACHE_DATABASE_NAME = os.getenv("EMBEDDING_CACHE_DB", "embedding_cache.db")
+MEMORY_CACHE_SIZE = 10_000
+DISK_CACHE_SIZE = 500_000
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (model name, hash of normalized text).
+
+    The first tier is an in-memory LRU holding up to memory_size vectors, the
+    second a SQLite table holding up to disk_size vectors. Both tiers store
+    vectors as float32 (array('f') in memory, its bytes on disk).
+    Least recently used rows are evicted from whichever tier overflows.
+    """
+
+    def __init__(self, path: str = CACHE_DATABASE_NAME, memory_size: int = MEMORY_CACHE_SIZE, disk_size: int = DISK_CACHE_SIZE):
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, texts):
+        """Return a list with the cached vector for each text, or None where it is not cached."""
+        keys = [(model, text_hash(text)) for text in texts]
+        results = [None] * len(keys)
+        disk_lookups = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    results[i] = vector.tolist()
+                else:
+                    disk_lookups.setdefault(key[1], []).append(i)
+
+            if disk_lookups:
+                hashes = list(disk_lookups)
+                found = []
+                for start in range(0, len(hashes), 500):
+                    part = hashes[start:start + 500]
+                    found.extend(self._conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                        (model, *part),
+                    ).fetchall())
+                now = time.time()
+                for hash_, blob in found:
+                    vector = array("f", blob)
+                    self._remember((model, hash_), vector)
+                    for i in disk_lookups.pop(hash_):
+                        results[i] = vector.tolist()
+                        self.disk_hits += 1
+                if found:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                        [(now, model, hash_) for hash_, _ in found],
+                    )
+                    self._conn.commit()
+                self.misses += sum(len(indexes) for indexes in disk_lookups.values())
+        return results
+
+    def get(self, model: str, text: str):
+        return self.get_many(model, [text])[0]
+
+    def put_many(self, model: str, texts, vectors):
+        now = time.time()
+        rows = {}
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = (model, text_hash(text))
+                vector = array("f", vector)
+                self._remember(key, vector)
+                rows[key[1]] = (model, key[1], vector.tobytes(), now)
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                list(rows.values()),
+            )
+            self._disk_entries += self._conn.total_changes - before
+            if self._disk_entries > self.disk_size:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (self._disk_entries - self.disk_size,),
+                )
+                self._disk_entries = self.disk_size
+            self._conn.commit()
+
+    def put(self, model: str, text: str, vector):
+        self.put_many(model, [text], [vector])
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_entries,
+        }
+
+
+_embedding_cache = None
+_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """The shared EmbeddingCache, opened (and its SQLite table created) on first use."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache()
+    return _embedding_cache
@@ -0,0 +1,75 @@
+import asyncio
+import heapq
+import itertools
+import time
+from concurrency import run_blocking
+from vector_db import get_collection, query_collection_by_embedding
+
+FEDERATED_DEFAULT_K = 5
+
+
+def _query_one(chroma_client, collection_name, query_embedding, n_results, where):
+    started = time.perf_counter()
+    collection = get_collection(chroma_client, collection_name)
+    results = query_collection_by_embedding(collection, query_embedding, n_results, where)
+    matches = [
+        {
+            "collection": collection_name,
+            "id": chunk_id,
+            "document": document,
+            "metadata": metadata,
+            "distance": distance,
+        }
+        for chunk_id, document, metadata, distance in zip(
+            results["ids"][0], results["documents"][0], results["metadatas"][0], results["distances"][0]
+        )
+    ]
+    return matches, time.perf_counter() - started
+
+
+async def _timed_query(chroma_client, collection_name, query_embedding, n_results, where):
+    started = time.perf_counter()
+    try:
+        matches, query_seconds = await run_blocking(
+            "chroma", _query_one, chroma_client, collection_name, query_embedding, n_results, where
+        )
+    except Exception as e:
+        return [], {"hits": 0, "seconds": round(time.perf_counter() - started, 4), "error": str(e)}
+    return matches, {
+        "hits": len(matches),
+        "seconds": round(time.perf_counter() - started, 4),
+        "query_seconds": round(query_seconds, 4),
+    }
+
+
+async def federated_query(chroma_client, collection_names, query_embedding, k: int = FEDERATED_DEFAULT_K,
+                          per_collection_k: int = None, where=None):
+    """
+    Query several collections at once and merge their hits by distance.
+
+    Every collection is queried concurrently (bounded by the "chroma" limit)
+    for its per_collection_k nearest chunks; the per-collection lists, each
+    already sorted by distance, are merged with a heap and cut to the global k.
+
+    Args:
+        collection_names: Candidate collections, e.g. from collection_router.rank.
+        k: Number of hits returned overall.
+        per_collection_k: Hits requested from each collection; defaults to k.
+        where: Chroma metadata filter applied in every collection.
+
+    Returns:
+        Dict with "matches" (collection, id, document, metadata, distance; closest
+        first) and "collections", the hits and latency of each collection query.
+        A collection that fails (missing, bad filter) reports its error instead.
+    """
+    per_collection_k = per_collection_k or k
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(
+        _timed_query(chroma_client, name, query_embedding, per_collection_k, where) for name in collection_names
+    ))
+    merged = heapq.merge(*(matches for matches, _ in outcomes), key=lambda match: match["distance"])
+    return {
+        "matches": list(itertools.islice(merged, k)),
+        "collections": {name: timing for name, (_, timing) in zip(collection_names, outcomes)},
+        "seconds": round(time.perf_counter() - started, 4),
+    }
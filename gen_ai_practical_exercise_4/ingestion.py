@@ -0,0 +1,313 @@
+import hashlib
+import itertools
+import json
+import os
+import time
+import numpy as np
+from answer_cache import answer_cache
+from concurrency import run_blocking
+from database import add_log_entry, get_document_manifest, save_document_manifest
+from embedding import get_embeddings_async, EMBED_BATCH_SIZE, EMBED_MAX_CONCURRENCY
+from text_processing import iter_chunks_of_stream, sanitize_topic, split_text
+from routing import collection_router
+from topic_modeling import build_topic_sample, topic_resolver
+from vector_db import (delete_chunks, get_chunk_id, get_document_id, get_or_create_collection, update_chunk_metadata,
+                       upsert_chunks, upsert_chunks_with_ids)
+
+# Number of chunks embedded between two progress reports.
+PROGRESS_STEP = EMBED_BATCH_SIZE * EMBED_MAX_CONCURRENCY
+
+UPLOAD_DIR = "uploads"
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
+
+def invalidate_answers(collection_name: str, document_id: str, start_index: int, count: int):
+    """Drop cached /search answers built from chunks that were just upserted again."""
+    answer_cache.invalidate(collection_name, [get_chunk_id(document_id, i) for i in range(start_index, start_index + count)])
+
+def resolve_collection_name(topic: str) -> str:
+    collection_name = sanitize_topic(topic)
+    if len(collection_name) < 3:
+        collection_name = "general"
+    return collection_name
+
+
+async def _no_report(**fields):
+    pass
+
+
+async def _resolve_topic(chroma_client, text: str, chunks_text, embeddings):
+    """
+    Topic, collection name and collection for embedded chunks of text.
+
+    The mean of the chunk embeddings is matched against the collection
+    centroids before falling back to the LLM, which then only sees a
+    bounded sample of the chunks (see build_topic_sample).
+    """
+    topic = await topic_resolver.resolve_async(
+        text,
+        np.mean(embeddings, axis=0) if embeddings else None,
+        sample=build_topic_sample(chunks_text, embeddings) if embeddings else None,
+    )
+    collection_name = resolve_collection_name(topic)
+    collection = await run_blocking("chroma", get_or_create_collection, chroma_client, collection_name)
+    return topic, collection_name, collection
+
+
+async def _embed_with_progress(chunks_text, report):
+    embeddings = []
+    for start in range(0, len(chunks_text), PROGRESS_STEP):
+        embeddings.extend(await get_embeddings_async(chunks_text[start:start + PROGRESS_STEP]))
+        await report(chunks_embedded=len(embeddings))
+    return embeddings
+
+
+async def ingest_text(chroma_client, text: str, chunk_size: int, overlap: int, metadata=None, report=_no_report):
+    """
+    Chunk a text, embed the chunks, resolve its topic and store the chunks in Chroma.
+
+    The topic is resolved after embedding, so the mean of the chunk
+    embeddings can be matched against the collection centroids before
+    falling back to the LLM, which then only sees a bounded sample of the
+    chunks.
+
+    Args:
+        report: Async callback receiving keyword updates (stage, topic,
+            collection_name, chunks_total, chunks_embedded, stage_timings)
+            whenever the pipeline moves forward.
+
+    Returns:
+        Dict with the topic, collection name, stored row count, upsert batches and stage timings.
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    await report(stage="chunking")
+    chunks_text = await run_blocking("cpu", split_text, text, chunk_size, overlap)
+    timings["chunking"] = round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    await report(stage="embedding", chunks_total=len(chunks_text), chunks_embedded=0, stage_timings=timings)
+    embeddings = await _embed_with_progress(chunks_text, report)
+    timings["embedding"] = round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    await report(stage="topic", stage_timings=timings)
+    topic, collection_name, collection = await _resolve_topic(chroma_client, text, chunks_text, embeddings)
+    timings["topic"] = round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    await report(stage="upsert", topic=topic, collection_name=collection_name, stage_timings=timings)
+    document_id = get_document_id(chunks_text)
+    batches = await run_blocking("chroma", upsert_chunks, collection, chunks_text, embeddings, metadata, document_id)
+    collection_router.add(collection_name, embeddings)
+    invalidate_answers(collection_name, document_id, 0, len(chunks_text))
+    await run_blocking("sqlite", add_log_entry, topic, collection_name)
+    timings["upsert"] = round(time.perf_counter() - started, 4)
+
+    return {
+        "topic": topic,
+        "collection_name": collection_name,
+        "rows": sum(batch["rows"] for batch in batches),
+        "batches": batches,
+        "stage_timings": timings,
+    }
+
+
+def get_keyed_chunk_ids(document_key: str, chunks_text):
+    """
+    Content-addressed ids for the chunks of a document identified by document_key.
+
+    A chunk keeps its id as long as its text is unchanged, wherever it moves
+    in the document; repeated texts are told apart by an occurrence counter.
+
+    Returns:
+        Tuple of (document id, list of (chunk id, chunk hash)).
+    """
+    document_id = hashlib.sha256(document_key.encode("utf-8")).hexdigest()[:16]
+    occurrences = {}
+    ids = []
+    for chunk in chunks_text:
+        chunk_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        occurrence = occurrences.get(chunk_hash, 0)
+        occurrences[chunk_hash] = occurrence + 1
+        ids.append((f"{document_id}-{chunk_hash[:16]}-{occurrence}", chunk_hash))
+    return document_id, ids
+
+
+async def ingest_document(chroma_client, document_key: str, text: str, chunk_size: int, overlap: int, metadata=None,
+                          report=_no_report):
+    """
+    Incrementally (re-)ingest a document identified by a caller-supplied key.
+
+    The chunks are diffed against the document's manifest from the previous
+    ingest: only chunks whose text is new are embedded and upserted, chunks
+    that moved (or whose metadata changed) only get their metadata updated,
+    and chunks that disappeared are deleted. A known document stays in its collection, so
+    the topic is only resolved on the first ingest.
+
+    Returns:
+        Like ingest_text, plus a "diff" dict with the number of added, updated,
+        unchanged and deleted chunks.
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    await report(stage="chunking")
+    chunks_text = await run_blocking("cpu", split_text, text, chunk_size, overlap)
+    document_id, chunk_ids = get_keyed_chunk_ids(document_key, chunks_text)
+    manifest = await run_blocking("sqlite", get_document_manifest, document_key)
+    previous = {chunk["chunk_id"]: chunk["chunk_index"] for chunk in manifest["chunks"]} if manifest else {}
+    metadata_json = json.dumps(metadata, sort_keys=True) if metadata is not None else None
+    metadata_changed = manifest is not None and manifest["metadata"] != metadata_json
+    added = [i for i, (chunk_id, _) in enumerate(chunk_ids) if chunk_id not in previous]
+    updated = [i for i, (chunk_id, _) in enumerate(chunk_ids)
+               if chunk_id in previous and (previous[chunk_id] != i or metadata_changed)]
+    current = {chunk_id for chunk_id, _ in chunk_ids}
+    removed = [chunk_id for chunk_id in previous if chunk_id not in current]
+    timings["chunking"] = round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    added_text = [chunks_text[i] for i in added]
+    await report(stage="embedding", chunks_total=len(added_text), chunks_embedded=0, stage_timings=timings)
+    embeddings = await _embed_with_progress(added_text, report)
+    timings["embedding"] = round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    await report(stage="topic", stage_timings=timings)
+    if manifest is not None:
+        topic = collection_name = manifest["collection_name"]
+    else:
+        topic = await topic_resolver.resolve_async(
+            text,
+            np.mean(embeddings, axis=0) if embeddings else None,
+            sample=build_topic_sample(added_text, embeddings) if embeddings else None,
+        )
+        collection_name = resolve_collection_name(topic)
+    collection = await run_blocking("chroma", get_or_create_collection, chroma_client, collection_name)
+    timings["topic"] = round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    await report(stage="upsert", topic=topic, collection_name=collection_name, stage_timings=timings)
+
+    def chunk_metadata(i):
+        return {**(metadata or {}), "document_id": document_id, "document_key": document_key, "chunk_index": i}
+
+    batches = await run_blocking("chroma", upsert_chunks_with_ids, collection,
+                                 [chunk_ids[i][0] for i in added], added_text, embeddings,
+                                 [chunk_metadata(i) for i in added])
+    await run_blocking("chroma", update_chunk_metadata, collection,
+                       [chunk_ids[i][0] for i in updated], [chunk_metadata(i) for i in updated])
+    removed_embeddings = await run_blocking("chroma", delete_chunks, collection, removed)
+    await run_blocking("sqlite", save_document_manifest, document_key, collection_name, metadata_json,
+                       [(i, chunk_id, chunk_hash) for i, (chunk_id, chunk_hash) in enumerate(chunk_ids)])
+
+    collection_router.add(collection_name, embeddings)
+    if len(removed_embeddings):
+        collection_router.add(collection_name, -np.asarray(removed_embeddings, dtype=np.float64))
+    answer_cache.invalidate(collection_name, [chunk_ids[i][0] for i in added] + removed)
+    await run_blocking("sqlite", add_log_entry, topic, collection_name)
+    timings["upsert"] = round(time.perf_counter() - started, 4)
+
+    return {
+        "topic": topic,
+        "collection_name": collection_name,
+        "rows": sum(batch["rows"] for batch in batches),
+        "batches": batches,
+        "diff": {
+            "added": len(added),
+            "updated": len(updated),
+            "unchanged": len(chunks_text) - len(added) - len(updated),
+            "deleted": len(removed),
+        },
+        "stage_timings": timings,
+    }
+
+
+def save_upload(fileobj, path: str) -> str:
+    """
+    Copy an uploaded file to path in fixed-size blocks.
+
+    Returns:
+        Document id of the upload (prefix of the SHA-256 of its bytes).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    digest = hashlib.sha256()
+    with open(path, "wb") as target:
+        while block := fileobj.read(UPLOAD_COPY_BUFFER):
+            digest.update(block)
+            target.write(block)
+    return digest.hexdigest()[:16]
+
+
+def _take(iterator, count: int):
+    return list(itertools.islice(iterator, count))
+
+
+async def ingest_file(chroma_client, path: str, document_id: str, chunk_size: int, overlap: int, metadata=None, report=_no_report):
+    """
+    Streaming variant of ingest_text for a UTF-8 file on disk.
+
+    The file is read and chunked incrementally; every PROGRESS_STEP chunks
+    are embedded and upserted before more of the file is read, so memory use
+    does not depend on the file size. The topic is resolved like in
+    ingest_text (centroid of the chunk embeddings, then a bounded sample
+    for the LLM) from the first PROGRESS_STEP chunks, which are the whole
+    document unless it is large; chunks_total is only known at the end, so
+    progress is reported as bytes_read out of bytes_total instead.
+    """
+    timings = {"topic": 0.0, "chunking": 0.0, "embedding": 0.0, "upsert": 0.0}
+
+    bytes_total = os.path.getsize(path)
+    await report(stage="streaming", chunks_embedded=0, bytes_read=0, bytes_total=bytes_total)
+    topic = collection_name = collection = None
+    batches = []
+    chunks_done = 0
+    with open(path, encoding="utf-8", errors="replace") as stream:
+        chunks = iter_chunks_of_stream(stream, chunk_size, overlap)
+        while True:
+            started = time.perf_counter()
+            chunks_text = await run_blocking("cpu", _take, chunks, PROGRESS_STEP)
+            timings["chunking"] += time.perf_counter() - started
+            if not chunks_text:
+                break
+
+            started = time.perf_counter()
+            embeddings = await get_embeddings_async(chunks_text)
+            timings["embedding"] += time.perf_counter() - started
+
+            if collection is None:
+                started = time.perf_counter()
+                topic, collection_name, collection = await _resolve_topic(
+                    chroma_client, "\n".join(chunks_text), chunks_text, embeddings
+                )
+                timings["topic"] += time.perf_counter() - started
+                await report(topic=topic, collection_name=collection_name)
+
+            started = time.perf_counter()
+            for batch in await run_blocking("chroma", upsert_chunks, collection, chunks_text, embeddings, metadata,
+                                            document_id, start_index=chunks_done):
+                batches.append({**batch, "batch": len(batches) + 1})
+            collection_router.add(collection_name, embeddings)
+            invalidate_answers(collection_name, document_id, chunks_done, len(chunks_text))
+            timings["upsert"] += time.perf_counter() - started
+
+            chunks_done += len(chunks_text)
+            # Bytes decoded so far; chunks up to a window behind that are still to come.
+            await report(chunks_embedded=chunks_done, bytes_read=stream.buffer.tell())
+
+    if collection is None:
+        topic, collection_name, _ = await _resolve_topic(chroma_client, "", [], [])
+        await report(topic=topic, collection_name=collection_name)
+
+    await run_blocking("sqlite", add_log_entry, topic, collection_name)
+    timings = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+    await report(chunks_total=chunks_done, bytes_read=bytes_total, stage_timings=timings)
+
+    return {
+        "topic": topic,
+        "collection_name": collection_name,
+        "rows": chunks_done,
+        "batches": batches,
+        "stage_timings": timings,
+    }
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import traceback
+import uuid
+from collections import deque
+from concurrency import run_blocking
+from database import create_job, get_job, get_unfinished_job_ids, update_job
+from ingestion import UPLOAD_DIR, ingest_document, ingest_file, ingest_text, save_upload
+
+INGEST_WORKERS = 2
+
+
+class IngestionJobQueue:
+    """
+    Runs /ingest requests as background jobs on a fixed pool of asyncio workers.
+
+    Every job is stored in the ingestion_jobs table before it is queued, and
+    its stage, progress and timings are written back as it runs. On start,
+    jobs left queued or running by a previous process are queued again; the
+    pipeline is idempotent (stable chunk ids, cached embeddings), so a
+    resumed job does not duplicate rows or re-embed finished chunks.
+
+    Jobs for the same document_key run one at a time, in submission order:
+    each incremental ingest diffs against the manifest saved by the
+    previous one, so two versions ingested side by side would both start
+    from the same old manifest and could leave orphaned chunks behind.
+    Only the first job of a key is queued; later ones wait in a per-key
+    list and are queued when the one before them finishes, so waiting jobs
+    never hold a worker.
+    """
+
+    def __init__(self, chroma_client, workers: int = INGEST_WORKERS):
+        self.chroma_client = chroma_client
+        self.workers = workers
+        self._queue = asyncio.Queue()
+        self._tasks = []
+        # document_key -> jobs waiting for the queued or running job of that key.
+        self._waiting = {}
+
+    async def start(self):
+        for job_id in await run_blocking("sqlite", get_unfinished_job_ids):
+            job = await run_blocking("sqlite", get_job, job_id)
+            self._enqueue(job_id, job["document_key"])
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, text: str, chunk_size: int, overlap: int, metadata=None, document_key: str = None) -> str:
+        """Queue a text; with a document_key it is ingested incrementally against that document's last version."""
+        job_id = uuid.uuid4().hex
+        await run_blocking("sqlite", create_job, job_id, text, chunk_size, overlap,
+                           json.dumps(metadata) if metadata is not None else None, document_key=document_key)
+        self._enqueue(job_id, document_key)
+        return job_id
+
+    async def submit_file(self, fileobj, chunk_size: int, overlap: int, metadata=None) -> str:
+        """Queue an uploaded text file; it is copied to UPLOAD_DIR and streamed from there."""
+        job_id = uuid.uuid4().hex
+        path = os.path.join(UPLOAD_DIR, f"{job_id}.txt")
+        document_id = await run_blocking("files", save_upload, fileobj, path)
+        await run_blocking("sqlite", create_job, job_id, None, chunk_size, overlap,
+                           json.dumps(metadata) if metadata is not None else None,
+                           source_path=path, document_id=document_id)
+        self._enqueue(job_id, None)
+        return job_id
+
+    def _enqueue(self, job_id: str, document_key: str = None):
+        if document_key is None:
+            self._queue.put_nowait((job_id, None))
+        elif document_key in self._waiting:
+            self._waiting[document_key].append(job_id)
+        else:
+            self._waiting[document_key] = deque()
+            self._queue.put_nowait((job_id, document_key))
+
+    def _release(self, document_key: str):
+        # Queued before task_done, so queue.join() also waits for the next job of the key.
+        waiting = self._waiting[document_key]
+        if waiting:
+            self._queue.put_nowait((waiting.popleft(), document_key))
+        else:
+            del self._waiting[document_key]
+
+    async def _worker(self):
+        while True:
+            job_id, document_key = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                if document_key is not None:
+                    self._release(document_key)
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await run_blocking("sqlite", get_job, job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            return
+
+        async def report(**fields):
+            if "stage_timings" in fields:
+                fields["stage_timings"] = json.dumps(fields["stage_timings"])
+            await run_blocking("sqlite", update_job, job_id, **fields)
+
+        await report(status="running")
+        metadata = json.loads(job["metadata"]) if job["metadata"] else None
+        cancelled = False
+        try:
+            if job["source_path"]:
+                result = await ingest_file(
+                    self.chroma_client,
+                    job["source_path"],
+                    job["document_id"],
+                    job["chunk_size"],
+                    job["overlap"],
+                    metadata,
+                    report=report,
+                )
+            elif job["document_key"]:
+                result = await ingest_document(
+                    self.chroma_client,
+                    job["document_key"],
+                    job["text"],
+                    job["chunk_size"],
+                    job["overlap"],
+                    metadata,
+                    report=report,
+                )
+            else:
+                result = await ingest_text(
+                    self.chroma_client,
+                    job["text"],
+                    job["chunk_size"],
+                    job["overlap"],
+                    metadata,
+                    report=report,
+                )
+        except asyncio.CancelledError:
+            # The upload is kept: the job is still running in the table and resumes on the next start.
+            cancelled = True
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            await report(status="failed", error=f"{type(e).__name__}: {e}")
+        else:
+            await report(
+                status="completed",
+                stage="done",
+                stage_timings=result["stage_timings"],
+                result=json.dumps({key: result[key] for key in ("rows", "batches", "diff") if key in result}),
+                text=None,
+            )
+        finally:
+            if job["source_path"] and not cancelled:
+                await run_blocking("files", _remove_file, job["source_path"])
+
+
+def _remove_file(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def describe_job(job):
+    """
+    Public view of an ingestion_jobs row for the /jobs endpoint.
+
+    Progress is chunks embedded out of chunks_total, or for streamed files,
+    whose chunk count is only known at the end, bytes read out of the file size.
+    """
+    total = job["chunks_total"]
+    if job["bytes_total"]:
+        progress = job["bytes_read"] / job["bytes_total"] if job["bytes_read"] else 0.0
+    else:
+        progress = job["chunks_embedded"] / total if total else 0.0
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "topic": job["topic"],
+        "collection_name": job["collection_name"],
+        "chunks_total": total,
+        "chunks_embedded": job["chunks_embedded"],
+        "bytes_read": job["bytes_read"],
+        "bytes_total": job["bytes_total"],
+        "progress": progress,
+        "stage_timings": json.loads(job["stage_timings"]) if job["stage_timings"] else {},
+        "result": json.loads(job["result"]) if job["result"] else None,
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
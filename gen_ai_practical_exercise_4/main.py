@@ -1,22 +1,92 @@
-from fastapi import FastAPI, Form, HTTPException
+from contextlib import asynccontextmanager, suppress
+import asyncio
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI, File, Form, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
+from collections import deque
 import json
-import os
-import google.genai as genai
-from text_processing import get_chunks_of_text, sanitize_topic
-from vector_db import init_chroma, get_or_create_collection, add_to_collection, query_collection, get_collection, list_collections
-import ollama
-from topic_modeling import get_topic
-from database import init_db, add_log_entry, get_log_entries
+import statistics
+import time
+from clients import get_chroma_client, get_gemini_client, loaded_clients
+from vector_db import migrate_collections
+from federated_search import FEDERATED_DEFAULT_K, federated_query
+from routing import collection_router
+from topic_modeling import topic_resolver
+from embedding import get_embeddings_async
+from database import init_db, query_log_entries, get_hourly_ingest_counts, get_job
+from jobs import IngestionJobQueue, describe_job
+from embedding_cache import get_embedding_cache
+from answer_cache import answer_cache
+from context_packing import context_packer
+from text_processing import check_chunk_arguments
+from concurrency import limit, run_blocking
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Upper bound on the collections a single /search may query.
+SEARCH_MAX_COLLECTIONS = 10
+# Chunks retrieved per collection for /search; the context packer merges
+# neighbouring ones and trims the result to its token budget.
+SEARCH_N_RESULTS = 3
+SEARCH_MAX_N_RESULTS = 20
+
+# Created by warm_up once Chroma is open.
+job_queue = None
+_warm_up_task = None
+_process_started = time.time()
+
+async def warm_up():
+    """
+    Open Chroma and the embedding cache, normalize collections holding legacy vectors (see migrate_collections),
+    load the routing index and start the ingestion workers, then preload the Gemini SDK.
+    """
+    global job_queue
+    chroma_client = await run_blocking("chroma", get_chroma_client)
+    await run_blocking("sqlite", get_embedding_cache)
+    migrated = await run_blocking("chroma", migrate_collections, chroma_client)
+    if migrated:
+        print(f"Normalized legacy embeddings to unit length: {migrated}")
+    await run_blocking("chroma", collection_router.load, chroma_client)
+    queue = IngestionJobQueue(chroma_client)
+    await queue.start()
+    job_queue = queue
+    try:
+        await run_blocking("cpu", get_gemini_client)
+    except Exception as e:
+        print(f"Gemini client not created during warm-up: {e}")
+
+def start_warm_up():
+    global _warm_up_task
+    if _warm_up_task is None:
+        _warm_up_task = asyncio.create_task(warm_up())
+    return _warm_up_task
+
+async def ready():
+    """Wait until warm_up has opened Chroma and started the job queue."""
+    await asyncio.shield(start_warm_up())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy SDKs (chromadb, google.genai, ollama) load in the background, so
+    # the server accepts requests, and /healthz answers, right away.
+    await run_blocking("sqlite", init_db)
+    start_warm_up()
+    yield
+    if not _warm_up_task.done():
+        _warm_up_task.cancel()
+    with suppress(BaseException):
+        await _warm_up_task
+    if job_queue is not None:
+        await job_queue.stop()
+
 app = FastAPI(
     title="Text Ingestion API",
     description="An API to ingest text, determine its topic, and store it in a vector database.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 class LogEntry(BaseModel):
@@ -25,87 +95,158 @@ class LogEntry(BaseModel):
     collection_name: str
     creation_date: str
 
-init_db()
-chroma_client = init_chroma()
-GOOGLE_AI_KEY = os.getenv("GOOGLE_API_KEY")
-client = genai.Client(api_key=GOOGLE_AI_KEY)
+class HourlyIngestCount(BaseModel):
+    hour: str
+    topic: str
+    ingests: int
+
+@app.get("/healthz", summary="Health Check", description="Liveness check that answers without loading any heavy dependency. `ready` tells whether Chroma is open and the ingestion workers are running.")
+async def healthz():
+    if _warm_up_task is None or not _warm_up_task.done():
+        warm_up_state = "starting"
+    elif _warm_up_task.cancelled() or _warm_up_task.exception() is not None:
+        warm_up_state = "failed"
+    else:
+        warm_up_state = "ready"
+    return {
+        "status": "ok",
+        "ready": job_queue is not None,
+        "warm_up": warm_up_state,
+        "clients": loaded_clients(),
+        "uptime_seconds": round(time.time() - _process_started, 3),
+    }
+
+def to_log_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Format a query datetime like ingestion_log.creation_date (UTC, naive values taken as UTC)."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+@app.get("/logs", summary="Get Ingestion Logs", description="Retrieve ingestion log entries, newest first, optionally filtered by topic, collection and creation time. When more entries exist, the X-Next-Cursor response header holds the cursor for the next page.", response_model=List[LogEntry])
+def get_logs(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    topic: Optional[str] = None,
+    collection: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    try:
+        entries, next_cursor = query_log_entries(
+            limit, cursor, topic, collection, to_log_timestamp(since), to_log_timestamp(until)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return entries
+
+@app.get("/logs/hourly", summary="Get Hourly Ingest Counts", description="Number of ingests per topic per hour between since and until (default: the last 24 hours).", response_model=List[HourlyIngestCount])
+def get_hourly_logs(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    topic: Optional[str] = None,
+    collection: Optional[str] = None,
+):
+    if since is None:
+        since = (until or datetime.now(timezone.utc)) - timedelta(days=1)
+    return get_hourly_ingest_counts(to_log_timestamp(since), to_log_timestamp(until), topic, collection)
+
+@app.get("/stats", summary="Get Cache Statistics", description="Hit/miss counters of the embedding cache, the topic resolver's tiers and the /search answer cache (including the latency it saved), plus time to first token and total latency of /search/stream.")
+def get_stats():
+    return {
+        "embedding_cache": get_embedding_cache().stats(),
+        "topics": topic_resolver.stats(),
+        "answer_cache": answer_cache.stats(),
+        "search_stream": streaming_stats.stats(),
+        "context_packing": context_packer.stats(),
+    }
+
+def parse_metadata(metadata: Optional[str], field: str = "metadata"):
+    if not metadata:
+        return None
+    try:
+        return json.loads(metadata)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON format for {field}.")
 
-@app.get("/logs", summary="Get Ingestion Logs", description="Retrieve the last 100 ingestion log entries from the database.", response_model=List[LogEntry])
-def get_logs():
-    return get_log_entries()
+def check_chunking(chunk_size: int, overlap: int):
+    try:
+        check_chunk_arguments(chunk_size, overlap)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
 
-@app.post("/ingest", summary="Ingest Text", description="Ingest text, determine its topic, chunk it, and store it in a vector database.")
+@app.post("/ingest", status_code=202, summary="Ingest Text", description="Queue text for ingestion: topic detection, chunking, embedding and storage in a vector database. Returns a job id to poll at /jobs/{job_id}. With a `document_key` the text replaces the previous version of that document incrementally: only new or changed chunks are embedded, removed chunks are deleted, and the job result reports the chunk diff.")
 async def ingest_data(
     text: str = Form(...),
-    chunk_size: int = Form(1000),
-    overlap: int = Form(200),
+    chunk_size: int = Form(1000, gt=0),
+    overlap: int = Form(200, ge=0),
     metadata: Optional[str] = Form(None),
+    document_key: Optional[str] = Form(None),
 ):
-    parsed_metadata = None
-    if metadata:
-        try:
-            parsed_metadata = json.loads(metadata)
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=400, detail="Invalid JSON format for metadata.")
-
-    topic = get_topic(text)
-    collection_name = sanitize_topic(topic)
-    if len(collection_name) < 3:
-        collection_name = "general"
-
-    collection = get_or_create_collection(chroma_client, collection_name)
-    chunks = get_chunks_of_text(text, chunk_size, overlap)
-    add_to_collection(collection, chunks, parsed_metadata)
-    add_log_entry(topic, collection_name)
-    return {"message": f"Text has been chunked and stored in the '{collection_name}' collection."}
-
-@app.get("/search", summary="Search for Information", description="Ask a question and get a response from the embedded Chroma DB. The response will be in Lithuanian.")
-async def search(question: str):
-    topic = get_topic(question)
-    collection_name = sanitize_topic(topic)
-    if len(collection_name) < 3:
-        collection_name = "general"
+    parsed_metadata = parse_metadata(metadata)
+    check_chunking(chunk_size, overlap)
+    await ready()
+    job_id = await job_queue.submit(text, chunk_size, overlap, parsed_metadata, document_key)
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
 
-    try:
-        collection = get_collection(chroma_client, collection_name)
-    except Exception as e:
-        collections = list_collections(chroma_client)
-        if not collections:
-            return {"error": "No collections found."}
-        
-        collection_names = [col.name for col in collections]
-
-        prompt = f"""Given the user's question, which of the following collections is most likely to contain the answer?
-        Question: {question}
-        Collections: {', '.join(collection_names)}
-        
-        Respond with only the single most relevant collection name.
-        """
-        response = ollama.generate(
-            model="gemma3",
-            prompt=prompt,
-            stream=False
-        )
-        collection_name = response.get('response', '').strip()
-        
-        if not collection_name or collection_name not in collection_names:
-            return {"error": f"Could not determine a relevant collection to search."}
-        
-        try:
-            collection = get_collection(chroma_client, collection_name)
-        except Exception as e:
-            return {"error": f"Collection for topic '{collection_name}' not found after attempting to find a relevant one."}
-
-    results = query_collection(collection, question)
-    
-    context = ""
-    if results and results['documents']:
-        context = "\n".join(results['documents'][0])
+@app.post("/ingest/file", status_code=202, summary="Ingest Text File", description="Queue a UTF-8 text file for streaming ingestion. The file is read and chunked incrementally, so its size is not limited by memory. Returns a job id to poll at /jobs/{job_id}.")
+async def ingest_file_upload(
+    file: UploadFile = File(...),
+    chunk_size: int = Form(1000, gt=0),
+    overlap: int = Form(200, ge=0),
+    metadata: Optional[str] = Form(None),
+):
+    parsed_metadata = parse_metadata(metadata)
+    check_chunking(chunk_size, overlap)
+    await ready()
+    job_id = await job_queue.submit_file(file.file, chunk_size, overlap, parsed_metadata)
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
 
-    if not context:
-        return {"response": "Atsiprašome, informacijos nerasta."}
+@app.get("/jobs/{job_id}", summary="Get Ingestion Job", description="Status, progress (chunks embedded out of total, or bytes read out of the file size for /ingest/file) and stage timings of an ingestion job.")
+async def get_ingestion_job(job_id: str):
+    job = await run_blocking("sqlite", get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return describe_job(job)
+
+@app.get("/search/federated", summary="Federated Search", description="Retrieve the closest chunks across several collections at once, without generating an answer. The question is routed to up to `collections` collections (all known ones by default), each is queried in parallel for `per_collection_k` hits (default `k`), and the hits are merged by distance into the global top `k`. `where` is an optional JSON Chroma metadata filter. The response includes per-collection latencies.")
+async def search_federated(
+    question: str,
+    collections: Optional[int] = Query(None, ge=1),
+    k: int = Query(FEDERATED_DEFAULT_K, ge=1, le=100),
+    per_collection_k: Optional[int] = Query(None, ge=1, le=100),
+    where: Optional[str] = None,
+):
+    where_filter = parse_metadata(where, "where")
+    await ready()
+    started = time.perf_counter()
+    question_embedding = (await get_embeddings_async([question]))[0]
+    embedding_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    routed = collection_router.rank(question_embedding, collections or len(collection_router))
+    routing_seconds = time.perf_counter() - started
+    if not routed:
+        return {"error": "No collections found."}
 
-    prompt = f'''Atsakykite į klausimą lietuviškai, remdamiesi šiuo kontekstu:
+    results = await federated_query(
+        get_chroma_client(), [name for name, _ in routed], question_embedding, k, per_collection_k, where_filter
+    )
+    for name, similarity in routed:
+        results["collections"][name]["similarity"] = round(similarity, 4)
+    results["embedding_seconds"] = round(embedding_seconds, 4)
+    results["routing_seconds"] = round(routing_seconds, 6)
+    return results
+
+ANSWER_MODEL = "models/gemini-1.5-flash"
+NO_CONTEXT_ANSWER = "Atsiprašome, informacijos nerasta."
+
+def build_answer_prompt(question: str, context: str) -> str:
+    return f'''Atsakykite į klausimą lietuviškai, remdamiesi šiuo kontekstu:
 
 Context: {context}
 
@@ -113,9 +254,155 @@ Question: {question}
 
 Answer:'''
 
-    response = client.models.generate_content(
-        model=f"models/gemini-1.5-flash",
-        contents=prompt,
-    )
+async def retrieve_context(question_embedding, collections: int, n_results: int):
+    """Route the question and fetch the n_results closest chunks of each routed collection; None when there are no collections."""
+    await ready()
+    routed = collection_router.rank(question_embedding, collections)
+    if not routed:
+        return None
+    return await federated_query(get_chroma_client(), [name for name, _ in routed], question_embedding,
+                                 k=len(routed) * n_results, per_collection_k=n_results)
+
+def context_chunk_ids(results):
+    return [(match["collection"], match["id"]) for match in results["matches"]]
+
+@app.get("/search", summary="Search for Information", description="Ask a question and get a response from the embedded Chroma DB. The question is routed to the collections whose centroids are closest to its embedding; up to `collections` of them are queried in parallel for their `n_results` closest chunks. Overlapping neighbouring chunks are merged and the context is trimmed to a token budget; the response reports the tokens this saved under `context`. Answers are cached and reused for sufficiently similar questions until a chunk they were built from is re-ingested. The response will be in Lithuanian.")
+async def search(
+    question: str,
+    collections: int = Query(1, ge=1, le=SEARCH_MAX_COLLECTIONS),
+    n_results: int = Query(SEARCH_N_RESULTS, ge=1, le=SEARCH_MAX_N_RESULTS),
+):
+    question_embedding = (await get_embeddings_async([question]))[0]
+    cached = answer_cache.lookup(question_embedding, (collections, n_results))
+    if cached is not None:
+        return {"response": cached}
+
+    started = time.perf_counter()
+    epochs = answer_cache.begin()
+    results = await retrieve_context(question_embedding, collections, n_results)
+    if results is None:
+        return {"error": "No collections found."}
+
+    context, packing = context_packer.pack(results["matches"])
+    if not context:
+        return {"response": NO_CONTEXT_ANSWER}
+
+    gemini = await run_blocking("cpu", get_gemini_client)
+    async with limit("gemini"):
+        response = await gemini.aio.models.generate_content(
+            model=ANSWER_MODEL,
+            contents=build_answer_prompt(question, context),
+        )
+
+    answer_cache.store(question_embedding, response.text, context_chunk_ids(results),
+                       time.perf_counter() - started, (collections, n_results), epochs)
+    return {"response": response.text, "context": packing}
+
+class StreamingStats:
+    """Time to first token and total latency of the most recent /search/stream answers."""
+
+    def __init__(self, window: int = 1000):
+        self.ttft = deque(maxlen=window)
+        self.total = deque(maxlen=window)
 
-    return {"response": response.text}
+    def record(self, ttft: Optional[float], total: float):
+        if ttft is not None:
+            self.ttft.append(ttft)
+        self.total.append(total)
+
+    @staticmethod
+    def _percentiles(samples):
+        if len(samples) < 2:
+            value = round(samples[0], 4) if samples else None
+            return {"p50": value, "p95": value}
+        cuts = statistics.quantiles(samples, n=20, method="inclusive")
+        return {"p50": round(cuts[9], 4), "p95": round(cuts[18], 4)}
+
+    def stats(self):
+        return {
+            "streams": len(self.total),
+            "ttft_seconds": self._percentiles(list(self.ttft)),
+            "total_seconds": self._percentiles(list(self.total)),
+        }
+
+streaming_stats = StreamingStats()
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_answer(question: str, collections: int, n_results: int):
+    """
+    Server-sent events for /search/stream.
+
+    Any failure after the response has started (embedding, routing,
+    retrieval or generation) ends the stream with an `error` event instead
+    of breaking the connection.
+    """
+    try:
+        started = time.perf_counter()
+        question_embedding = (await get_embeddings_async([question]))[0]
+        cached = answer_cache.lookup(question_embedding, (collections, n_results))
+        if cached is not None:
+            yield sse_event("retrieval", {"cached": True, "seconds": round(time.perf_counter() - started, 4)})
+            yield sse_event("token", {"text": cached})
+            elapsed = time.perf_counter() - started
+            streaming_stats.record(elapsed, elapsed)
+            yield sse_event("done", {"ttft_seconds": round(elapsed, 4), "total_seconds": round(elapsed, 4)})
+            return
+
+        epochs = answer_cache.begin()
+        results = await retrieve_context(question_embedding, collections, n_results)
+        if results is None:
+            yield sse_event("error", {"error": "No collections found."})
+            return
+        context, packing = context_packer.pack(results["matches"])
+        yield sse_event("retrieval", {
+            "cached": False,
+            "matches": [{key: match[key] for key in ("collection", "id", "distance")} for match in results["matches"]],
+            "collections": results["collections"],
+            "context": packing,
+            "seconds": round(time.perf_counter() - started, 4),
+        })
+
+        if not context:
+            yield sse_event("token", {"text": NO_CONTEXT_ANSWER})
+            yield sse_event("done", {"ttft_seconds": None, "total_seconds": round(time.perf_counter() - started, 4)})
+            return
+
+        parts, ttft = [], None
+        gemini = await run_blocking("cpu", get_gemini_client)
+        async with limit("gemini"):
+            stream = await gemini.aio.models.generate_content_stream(
+                model=ANSWER_MODEL,
+                contents=build_answer_prompt(question, context),
+            )
+            async for chunk in stream:
+                if not chunk.text:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                parts.append(chunk.text)
+                yield sse_event("token", {"text": chunk.text})
+
+        total = time.perf_counter() - started
+        streaming_stats.record(ttft, total)
+        answer_cache.store(question_embedding, "".join(parts), context_chunk_ids(results), total,
+                           (collections, n_results), epochs)
+        yield sse_event("done", {
+            "ttft_seconds": round(ttft, 4) if ttft is not None else None,
+            "total_seconds": round(total, 4),
+        })
+    except Exception as e:
+        yield sse_event("error", {"error": str(e)})
+
+@app.get("/search/stream", summary="Search with Streamed Answer", description="Like /search, but returns server-sent events: a `retrieval` event with the routed collections and matched chunks as soon as retrieval finishes, then one `token` event per Gemini chunk as it arrives, and a final `done` event with time to first token and total latency (or an `error` event).")
+async def search_stream(
+    question: str,
+    collections: int = Query(1, ge=1, le=SEARCH_MAX_COLLECTIONS),
+    n_results: int = Query(SEARCH_N_RESULTS, ge=1, le=SEARCH_MAX_N_RESULTS),
+):
+    return StreamingResponse(
+        stream_answer(question, collections, n_results),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
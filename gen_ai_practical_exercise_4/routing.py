@@ -0,0 +1,91 @@
+import threading
+import numpy as np
+
+# Stored embeddings read per collection when bootstrapping centroids from Chroma.
+CENTROID_SAMPLE_SIZE = 1000
+
+
+class CollectionRouter:
+    """
+    Routing index with one centroid embedding per collection.
+
+    Each collection is summarized by the sum of the embeddings stored in it,
+    whose direction is the centroid's. rank() scores a query vector against
+    every centroid with a single matrix-vector product, so routing a question
+    costs microseconds instead of an LLM round trip.
+
+    Centroids are bootstrapped from Chroma with load() and kept up to date by
+    add() as chunks are ingested.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = []
+        self._positions = {}
+        self._sums = None
+        # Unit-length centroids, one row per collection; rebuilt lazily after updates.
+        self._centroids = None
+
+    def __len__(self):
+        return len(self._names)
+
+    def names(self):
+        return list(self._names)
+
+    def load(self, chroma_client, sample_size: int = CENTROID_SAMPLE_SIZE):
+        """Compute a centroid for every existing collection from up to sample_size stored embeddings."""
+        for collection in chroma_client.list_collections():
+            rows = collection.get(include=["embeddings"], limit=sample_size)
+            if rows["embeddings"] is not None and len(rows["embeddings"]):
+                self.add(collection.name, rows["embeddings"], replace=True)
+
+    def add(self, collection_name: str, vectors, replace: bool = False):
+        """Add embeddings stored in collection_name to its centroid (or replace the centroid)."""
+        vectors = np.asarray(vectors, dtype=np.float64)
+        if not len(vectors):
+            return
+        total = vectors.sum(axis=0)
+        with self._lock:
+            position = self._positions.get(collection_name)
+            if position is None:
+                row = total[np.newaxis, :]
+                self._sums = row if self._sums is None else np.vstack([self._sums, row])
+                self._positions[collection_name] = len(self._names)
+                self._names = self._names + [collection_name]
+            elif replace:
+                self._sums[position] = total
+            else:
+                self._sums[position] += total
+            self._centroids = None
+
+    def _centroid_matrix(self):
+        with self._lock:
+            if self._centroids is None and self._sums is not None:
+                norms = np.linalg.norm(self._sums, axis=1, keepdims=True)
+                self._centroids = (self._sums / np.where(norms, norms, 1.0)).astype(np.float32)
+            return self._names, self._centroids
+
+    def rank(self, vector, k: int = 1):
+        """
+        The k collections whose centroids are most similar to vector.
+
+        Returns:
+            List of (collection name, cosine similarity), most similar first.
+        """
+        names, centroids = self._centroid_matrix()
+        if centroids is None or k <= 0:
+            return []
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return []
+        similarities = centroids @ (vector / norm)
+        if k < len(names):
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top])]
+        else:
+            top = np.argsort(-similarities)
+        return [(names[i], float(similarities[i])) for i in top]
+
+
+collection_router = CollectionRouter()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for context packing: merging consecutive chunks, dropping duplicates,
+and fitting spans that are larger than the token budget.
+"""
+
+import pytest
+
+from context_packing import ContextPacker, merge_overlapping, trim_to_tokens
+from text_processing import estimate_tokens
+
+
+def _match(index, text, distance, document_id="doc"):
+    return {"collection": "rules", "id": f"{document_id}-{index}", "document": text, "distance": distance,
+            "metadata": {"document_id": document_id, "chunk_index": index}}
+
+
+def _sentences(prefix, count):
+    return " ".join(f"{prefix} sentence {i} of the rules." for i in range(count))
+
+
+def test_consecutive_chunks_merge_and_duplicates_drop():
+    first, second = "Alpha beta gamma delta epsilon zeta.", "gamma delta epsilon zeta. Eta theta."
+    context, report = ContextPacker().pack([
+        _match(0, first, 0.2),
+        _match(1, second, 0.1),
+        _match(0, first, 0.3, document_id="copy"),
+        _match(1, second, 0.3, document_id="copy"),
+    ])
+    assert context == merge_overlapping(first, second) == "Alpha beta gamma delta epsilon zeta. Eta theta."
+    assert (report["spans"], report["spans_used"], report["tokens_cut"]) == (2, 1, 0)
+    assert report["tokens_saved"] > 0
+
+
+def test_oversized_single_chunk_is_trimmed():
+    chunk = _sentences("Long", 250)
+    assert estimate_tokens(chunk) > 1500
+    context, report = ContextPacker(token_budget=1500).pack([_match(0, chunk, 0.1)])
+    assert context and chunk.startswith(context)
+    assert estimate_tokens(context) <= 1500
+    assert chunk[len(context)] == " "
+    assert report["spans_trimmed"] == 1
+    assert report["tokens_saved"] == 0
+    assert report["tokens_cut"] == estimate_tokens(chunk) - estimate_tokens(context)
+
+
+def test_oversized_merged_span_keeps_chunks_around_the_best():
+    chunks = [_sentences(f"Chunk{i}", 20) for i in range(10)]
+    assert all(len(chunk) > 600 for chunk in chunks)
+    matches = [_match(i, chunk, 0.5 - abs(i - 6) * 0.01) for i, chunk in enumerate(chunks)]
+    matches.append(_match(0, "A short and worse match.", 0.9, document_id="other"))
+
+    context, report = ContextPacker(token_budget=1500).pack(matches)
+    assert chunks[6] in context
+    assert estimate_tokens(context) <= 1500
+    kept = [i for i, chunk in enumerate(chunks) if chunk in context]
+    assert kept == list(range(kept[0], kept[-1] + 1))
+    assert 1 < len(kept) < 10
+    assert report["spans_trimmed"] == 1
+    assert report["tokens_cut"] > 0
+
+
+def test_later_span_is_not_trimmed_mid_chunk():
+    packer = ContextPacker(token_budget=50)
+    context, report = packer.pack([
+        _match(0, "x" * 160, 0.1),
+        _match(0, "y" * 100, 0.2, document_id="other"),
+    ])
+    assert context == "x" * 160
+    assert report["spans_used"] == 1
+    assert packer.stats()["tokens_cut"] == 25
+
+
+@pytest.mark.parametrize("text, tokens, expected", [
+    ("short", 10, "short"),
+    ("one two three four", 3, "one two"),
+    ("first part\n\nsecond part", 5, "first part"),
+    ("abcdefghijkl", 2, "abcdefgh"),
+])
+def test_trim_to_tokens(text, tokens, expected):
+    assert trim_to_tokens(text, tokens) == expected
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
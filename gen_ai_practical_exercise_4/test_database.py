@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for the ingestion log against a temporary SQLite database: the
+background log writer, keyset-paginated and filtered log queries, and
+hourly ingest counts.
+"""
+
+import sqlite3
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+
+
+def _flushes(writer, timeout=5.0):
+    thread = threading.Thread(target=writer.flush, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+class FlakyConnectionManager(database.ConnectionManager):
+    """Fails to open a connection the first time it is asked for one."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.failed = False
+
+    def connection(self):
+        if not self.failed:
+            self.failed = True
+            raise sqlite3.OperationalError("unable to open database file")
+        return super().connection()
+
+
+def test_log_writer_survives_connection_failure(db, monkeypatch):
+    writer = database.LogWriter(FlakyConnectionManager(db.DATABASE_NAME))
+    monkeypatch.setattr(db, "log_writer", writer)
+
+    db.add_log_entry("art", "art")
+    assert _flushes(writer)
+    db.add_log_entry("law", "law")
+    assert _flushes(writer)
+
+    entries, _ = db.query_log_entries()
+    assert [entry["topic"] for entry in entries] == ["law"]
+
+
+
+def _insert(db, rows):
+    """Insert (topic, collection_name, creation_date) rows directly, bypassing the writer."""
+    conn = db.connections.connection()
+    conn.executemany("INSERT INTO ingestion_log (topic, collection_name, creation_date) VALUES (?, ?, ?)", rows)
+    conn.commit()
+
+
+@pytest.fixture
+def log(db):
+    # Two entries share each timestamp, so paging has to break ties on id.
+    _insert(db, [
+        ("art", "art", "2026-01-01 10:00:00"),
+        ("law", "law", "2026-01-01 10:00:00"),
+        ("art", "art-2", "2026-01-01 10:30:00"),
+        ("law", "law", "2026-01-01 11:15:00"),
+        ("art", "art", "2026-01-01 11:15:00"),
+        ("art", "art", "2026-01-02 09:00:00"),
+    ])
+    return db
+
+
+def _all_pages(db, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        entries, cursor = db.query_log_entries(limit, cursor, **filters)
+        pages.append([entry["id"] for entry in entries])
+        if cursor is None:
+            return pages
+
+
+def test_pages_walk_newest_first_without_gaps(log):
+    assert _all_pages(log, 2) == [[6, 5], [4, 3], [2, 1]]
+    assert _all_pages(log, 4) == [[6, 5, 4, 3], [2, 1]]
+    assert _all_pages(log, 10) == [[6, 5, 4, 3, 2, 1]]
+
+
+def test_filters_combine_with_paging(log):
+    assert _all_pages(log, 2, topic="art") == [[6, 5], [3, 1]]
+    assert _all_pages(log, 2, collection_name="law") == [[4, 2]]
+    assert _all_pages(log, 2, topic="art", since="2026-01-01 10:30:00", until="2026-01-02 00:00:00") == [[5, 3]]
+    assert log.query_log_entries(10, topic="art", collection_name="law") == ([], None)
+
+
+def test_get_log_entries_is_the_first_page(log):
+    assert [entry["id"] for entry in log.get_log_entries(3)] == [6, 5, 4]
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24=", "WzFd"])
+def test_invalid_cursor_is_rejected(log, cursor):
+    with pytest.raises(ValueError):
+        log.query_log_entries(10, cursor)
+
+
+def test_logs_endpoint_pages_and_rejects_bad_cursor(log):
+    import main
+
+    client = TestClient(main.app)
+    response = client.get("/logs", params={"limit": 4})
+    assert response.status_code == 200
+    assert [entry["id"] for entry in response.json()] == [6, 5, 4, 3]
+    response = client.get("/logs", params={"limit": 4, "cursor": response.headers["X-Next-Cursor"]})
+    assert [entry["id"] for entry in response.json()] == [2, 1]
+    assert "X-Next-Cursor" not in response.headers
+    assert client.get("/logs", params={"cursor": "not-base64!"}).status_code == 400
+
+
+def test_hourly_ingest_counts(log):
+    assert log.get_hourly_ingest_counts("2026-01-01 00:00:00", "2026-01-02 00:00:00") == [
+        {"hour": "2026-01-01 10:00:00", "topic": "art", "ingests": 2},
+        {"hour": "2026-01-01 10:00:00", "topic": "law", "ingests": 1},
+        {"hour": "2026-01-01 11:00:00", "topic": "art", "ingests": 1},
+        {"hour": "2026-01-01 11:00:00", "topic": "law", "ingests": 1},
+    ]
+    assert log.get_hourly_ingest_counts("2026-01-01 00:00:00", topic="law", collection_name="law") == [
+        {"hour": "2026-01-01 10:00:00", "topic": "law", "ingests": 1},
+        {"hour": "2026-01-01 11:00:00", "topic": "law", "ingests": 1},
+    ]
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for the two-tier embedding cache, that the shared cache is only opened
+on first use, and that the driving bot's copy
+(classwork/driving_bot/modules/embedding_cache.py) has not drifted from it.
+"""
+
+import importlib.util
+import inspect
+import os
+import sys
+
+import pytest
+
+import embedding_cache
+from embedding_cache import EmbeddingCache
+
+DRIVING_BOT_EMBEDDING_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                           "classwork", "driving_bot", "modules", "embedding_cache.py")
+
+
+def test_driving_bot_copy_matches(monkeypatch):
+    spec = importlib.util.spec_from_file_location("driving_bot_embedding_cache", DRIVING_BOT_EMBEDDING_CACHE)
+    copy = importlib.util.module_from_spec(spec)
+    # inspect finds class source through sys.modules.
+    monkeypatch.setitem(sys.modules, spec.name, copy)
+    spec.loader.exec_module(copy)
+    for name in ("normalize_text", "text_hash", "EmbeddingCache", "get_embedding_cache"):
+        assert inspect.getsource(getattr(copy, name)) == inspect.getsource(getattr(embedding_cache, name)), name
+
+
+def test_shared_cache_opens_on_first_use(tmp_path, monkeypatch):
+    path = tmp_path / "cache.db"
+    monkeypatch.setenv("EMBEDDING_CACHE_DB", str(path))
+    spec = importlib.util.spec_from_file_location("fresh_embedding_cache", embedding_cache.__file__)
+    fresh = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fresh)
+    assert not path.exists()
+    assert fresh.get_embedding_cache() is fresh.get_embedding_cache()
+    assert path.exists()
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = EmbeddingCache(path, memory_size=1)
+    cache.put_many("model", ["a  b", "c"], [[1.0, 2.0], [3.0, 4.0]])
+    assert cache.get_many("model", ["a b", "c", "d"]) == [[1.0, 2.0], [3.0, 4.0], None]
+    assert cache.get("other-model", "c") is None
+    assert (cache.memory_hits, cache.disk_hits, cache.misses) == (1, 1, 2)
+
+    reopened = EmbeddingCache(path)
+    assert reopened.get("model", "c") == [3.0, 4.0]
+    assert reopened.stats()["disk_entries"] == 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
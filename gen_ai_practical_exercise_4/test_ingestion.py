@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Tests for ingestion: the chunk diff of incremental ingestion against the
+stored manifest, serialized ingests of one document in the job queue,
+topic resolution and byte progress for streamed files, and cleanup of
+uploaded files. Embeddings and topics are faked;
+Chroma and SQLite are temporary.
+"""
+
+import asyncio
+import hashlib
+import io
+
+import numpy as np
+import pytest
+
+import ingestion
+import jobs
+from routing import CollectionRouter
+from topic_modeling import build_topic_sample
+
+chromadb = pytest.importorskip("chromadb")
+
+CHUNK_SIZE = 40
+
+
+def _paragraphs(*numbers):
+    return "\n\n".join(f"Paragraph number {number} about reptiles." for number in numbers)
+
+
+def _vector(text):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [digest[0] + 1.0, digest[1] + 1.0, digest[2] + 1.0]
+
+
+@pytest.fixture
+def pipeline(db, tmp_path, monkeypatch):
+    """Ingestion against a temporary Chroma, with fake embeddings and a fixed topic."""
+    embedded = []
+    topic_calls = []
+
+    async def embed(texts):
+        embedded.extend(texts)
+        await asyncio.sleep(0.01 * len(texts))
+        return [_vector(text) for text in texts]
+
+    async def resolve(text, embedding=None, sample=None):
+        topic_calls.append((text, embedding, sample))
+        return "reptiles"
+
+    monkeypatch.setattr(ingestion, "get_embeddings_async", embed)
+    monkeypatch.setattr(ingestion.topic_resolver, "resolve_async", resolve)
+    monkeypatch.setattr(ingestion, "collection_router", CollectionRouter())
+    client = chromadb.PersistentClient(path=str(tmp_path / "vector-db"))
+    return client, embedded, topic_calls
+
+
+def _ingest(client, text, metadata=None):
+    return asyncio.run(ingestion.ingest_document(client, "doc", text, CHUNK_SIZE, 0, metadata))
+
+
+def _stored(client, db):
+    rows = client.get_collection("reptiles").get(include=["documents", "metadatas"])
+    stored = sorted(zip(rows["ids"], rows["documents"], rows["metadatas"]), key=lambda row: row[2]["chunk_index"])
+    manifest = db.get_document_manifest("doc")
+    assert [row[0] for row in stored] == [chunk["chunk_id"] for chunk in manifest["chunks"]]
+    return [document for _, document, _ in stored], [metadata for _, _, metadata in stored]
+
+
+def test_first_ingest_adds_every_chunk(pipeline, db):
+    client, embedded, _ = pipeline
+    result = _ingest(client, _paragraphs(0, 1, 2))
+    assert result["diff"] == {"added": 3, "updated": 0, "unchanged": 0, "deleted": 0}
+    assert len(embedded) == 3
+    documents, _ = _stored(client, db)
+    assert documents == [f"Paragraph number {i} about reptiles." for i in range(3)]
+
+
+def test_reingest_embeds_only_new_chunks(pipeline, db):
+    client, embedded, _ = pipeline
+    _ingest(client, _paragraphs(0, 1, 2))
+    embedded.clear()
+
+    assert _ingest(client, _paragraphs(0, 1, 2))["diff"] == {"added": 0, "updated": 0, "unchanged": 3, "deleted": 0}
+    assert embedded == []
+
+    # 3 is new, 2 is removed, 0 and 1 swap places.
+    result = _ingest(client, _paragraphs(1, 0, 3))
+    assert result["diff"] == {"added": 1, "updated": 2, "unchanged": 0, "deleted": 1}
+    assert embedded == ["Paragraph number 3 about reptiles."]
+    documents, metadatas = _stored(client, db)
+    assert documents == [f"Paragraph number {i} about reptiles." for i in (1, 0, 3)]
+    assert [metadata["chunk_index"] for metadata in metadatas] == [0, 1, 2]
+
+
+def test_metadata_change_updates_without_embedding(pipeline, db):
+    client, embedded, _ = pipeline
+    _ingest(client, _paragraphs(0, 1), {"source": "a"})
+    embedded.clear()
+
+    result = _ingest(client, _paragraphs(0, 1), {"source": "b"})
+    assert result["diff"] == {"added": 0, "updated": 2, "unchanged": 0, "deleted": 0}
+    assert embedded == []
+    _, metadatas = _stored(client, db)
+    assert [metadata["source"] for metadata in metadatas] == ["b", "b"]
+
+
+def test_repeated_chunks_get_distinct_ids(pipeline, db):
+    client, _, _ = pipeline
+    result = _ingest(client, _paragraphs(0, 0, 1))
+    assert result["diff"]["added"] == 3
+    documents, _ = _stored(client, db)
+    assert documents == [f"Paragraph number {i} about reptiles." for i in (0, 0, 1)]
+
+
+def test_queued_versions_of_a_document_run_in_order(pipeline, db):
+    client, _, _ = pipeline
+    _ingest(client, _paragraphs(0, 1))
+
+    async def run():
+        queue = jobs.IngestionJobQueue(client, workers=2)
+        await queue.start()
+        # The first version adds a chunk (slow to embed) that the second one drops again.
+        first = await queue.submit(_paragraphs(0, 1, *range(2, 12)), CHUNK_SIZE, 0, document_key="doc")
+        second = await queue.submit(_paragraphs(0, 1), CHUNK_SIZE, 0, document_key="doc")
+        await queue._queue.join()
+        await queue.stop()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert db.get_job(first)["status"] == "completed"
+    assert db.get_job(second)["status"] == "completed"
+    documents, _ = _stored(client, db)
+    assert documents == [f"Paragraph number {i} about reptiles." for i in (0, 1)]
+
+
+def test_waiting_versions_do_not_hold_workers(pipeline, db):
+    client, _, _ = pipeline
+    finished = []
+
+    async def run():
+        queue = jobs.IngestionJobQueue(client, workers=2)
+        run_job = queue._run
+
+        async def record(job_id):
+            await run_job(job_id)
+            finished.append(job_id)
+
+        queue._run = record
+        await queue.start()
+        versions = [await queue.submit(_paragraphs(*range(count)), CHUNK_SIZE, 0, document_key="doc")
+                    for count in (12, 2, 3)]
+        other = await queue.submit(_paragraphs(0), CHUNK_SIZE, 0, document_key="other")
+        await queue._queue.join()
+        await queue.stop()
+        return versions, other
+
+    versions, other = asyncio.run(run())
+    # The second worker is free for the other document while the versions of "doc" run in order.
+    assert finished == [other, *versions]
+
+
+def test_streamed_file_topic_uses_centroid_and_sample(pipeline, db, tmp_path, monkeypatch):
+    client, _, topic_calls = pipeline
+    monkeypatch.setattr(ingestion, "PROGRESS_STEP", 40)
+    path = tmp_path / "reptiles.txt"
+    path.write_text(_paragraphs(*range(100)), encoding="utf-8")
+
+    result = asyncio.run(ingestion.ingest_file(client, str(path), "file-doc", CHUNK_SIZE, 0))
+    assert result["rows"] == 100
+    assert client.get_collection("reptiles").count() == 100
+
+    # Resolved once, like ingest_text, from the first PROGRESS_STEP chunks.
+    [(text, embedding, sample)] = topic_calls
+    first_batch = [f"Paragraph number {i} about reptiles." for i in range(40)]
+    vectors = [_vector(chunk) for chunk in first_batch]
+    assert text == "\n".join(first_batch)
+    assert list(embedding) == pytest.approx(list(np.mean(vectors, axis=0)))
+    assert sample == build_topic_sample(first_batch, vectors)
+
+
+def test_empty_file_still_gets_a_topic(pipeline, db, tmp_path):
+    client, _, topic_calls = pipeline
+    path = tmp_path / "empty.txt"
+    path.write_text("", encoding="utf-8")
+    result = asyncio.run(ingestion.ingest_file(client, str(path), "empty-doc", CHUNK_SIZE, 0))
+    assert (result["topic"], result["rows"]) == ("reptiles", 0)
+    assert topic_calls == [("", None, None)]
+
+
+def test_streamed_file_reports_bytes_read(pipeline, db, tmp_path, monkeypatch):
+    client, _, _ = pipeline
+    monkeypatch.setattr(ingestion, "PROGRESS_STEP", 10)
+    path = tmp_path / "reptiles.txt"
+    # A few stream windows, so bytes_read moves before the end of the file.
+    path.write_text(_paragraphs(*range(300)), encoding="utf-8")
+    size = path.stat().st_size
+    reports = []
+
+    async def embed(texts):
+        return [_vector(text) for text in texts]
+
+    async def report(**fields):
+        reports.append(fields)
+
+    monkeypatch.setattr(ingestion, "get_embeddings_async", embed)
+    asyncio.run(ingestion.ingest_file(client, str(path), "file-doc", CHUNK_SIZE, 0, report=report))
+    assert reports[0]["bytes_total"] == size
+    progress = [fields["bytes_read"] for fields in reports if "bytes_read" in fields]
+    assert progress == sorted(progress)
+    assert progress[0] == 0 and 0 < progress[len(progress) // 2] < size and progress[-1] == size
+
+    row = {"chunks_total": None, "chunks_embedded": 500, "bytes_read": size // 4, "bytes_total": size}
+    row.update({key: None for key in ("id", "status", "stage", "topic", "collection_name", "stage_timings", "result",
+                                      "error", "created_at", "updated_at")})
+    assert jobs.describe_job(row)["progress"] == pytest.approx(0.25, abs=0.01)
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_upload_is_removed_when_the_job_finishes(pipeline, db, tmp_path, monkeypatch, fails):
+    client, _, _ = pipeline
+    monkeypatch.setattr(jobs, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    if fails:
+        async def embed(texts):
+            raise RuntimeError("embedding service down")
+
+        monkeypatch.setattr(ingestion, "get_embeddings_async", embed)
+
+    async def run():
+        queue = jobs.IngestionJobQueue(client)
+        await queue.start()
+        job_id = await queue.submit_file(io.BytesIO(_paragraphs(0, 1).encode("utf-8")), CHUNK_SIZE, 0)
+        await queue._queue.join()
+        await queue.stop()
+        return job_id
+
+    job_id = asyncio.run(run())
+    assert db.get_job(job_id)["status"] == ("failed" if fails else "completed")
+    assert list((tmp_path / "uploads").iterdir()) == []
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
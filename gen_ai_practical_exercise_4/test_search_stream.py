@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests for /search/stream: failures anywhere in the pipeline end the
+server-sent event stream with an `error` event.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+def _events(response):
+    return [block.split("\n")[0].removeprefix("event: ") for block in response.text.strip().split("\n\n")]
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_embedding_failure_ends_with_error_event(client, monkeypatch):
+    async def unreachable(texts):
+        raise ConnectionError("Failed to connect to Ollama")
+
+    monkeypatch.setattr(main, "get_embeddings_async", unreachable)
+    response = client.get("/search/stream", params={"question": "Kas yra Portugalija?"})
+    assert response.status_code == 200
+    assert _events(response) == ["error"]
+    assert "Failed to connect to Ollama" in response.text
+
+
+def test_retrieval_failure_ends_with_error_event(client, monkeypatch):
+    async def embed(texts):
+        return [[0.5, 0.5, 0.0] for _ in texts]
+
+    async def broken_retrieval(question_embedding, collections, n_results):
+        raise RuntimeError("Chroma is not available")
+
+    monkeypatch.setattr(main, "get_embeddings_async", embed)
+    monkeypatch.setattr(main, "retrieve_context", broken_retrieval)
+    response = client.get("/search/stream", params={"question": "Kas yra Portugalija?"})
+    assert _events(response) == ["error"]
+    assert "Chroma is not available" in response.text
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the native chunker in text_processing: parity with the driving
+bot's copy (classwork/driving_bot/modules/chunking.py), the chunk size and
+overlap invariants of iter_chunks_of_stream across window seams, and the
+rejection of invalid chunk sizes and overlaps. Parity with LangChain's
+RecursiveCharacterTextSplitter is tested on the copy, in
+classwork/driving_bot/test_chunking.py.
+"""
+
+import importlib.util
+import io
+import os
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from text_processing import get_chunks_of_text, iter_chunks_of_stream, split_text
+
+DRIVING_BOT_CHUNKING = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                    "classwork", "driving_bot", "modules", "chunking.py")
+PIECES = ["word", "a", " ", "  ", "\n", "\n\n", "\n\n\n", "\t", "x" * 60, " \n "]
+
+
+def _random_cases(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        text = "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 150)))
+        chunk_size = rng.randint(1, 100)
+        yield text, chunk_size, rng.randint(0, chunk_size - 1)
+
+
+def _load_driving_bot_chunking():
+    spec = importlib.util.spec_from_file_location("driving_bot_chunking", DRIVING_BOT_CHUNKING)
+    chunking = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(chunking)
+    return chunking
+
+
+def _numbered_text(rng, words):
+    """Text of unique, fixed-width words, so every chunk can be located in it unambiguously."""
+    separators = [" ", " ", " ", "\n", "\n\n", "  "]
+    return "".join(f"w{i:05d}" + rng.choice(separators) for i in range(words))
+
+
+def test_driving_bot_copy_matches():
+    # The chunker is duplicated in the driving bot, which is not an installable package; keep the copies in sync.
+    chunking = _load_driving_bot_chunking()
+    for text, chunk_size, chunk_overlap in _random_cases(2, 300):
+        assert chunking.split_text(text, chunk_size, chunk_overlap) == split_text(text, chunk_size, chunk_overlap)
+        assert chunking.get_chunks_of_text(text, chunk_size, chunk_overlap) == \
+            get_chunks_of_text(text, chunk_size, chunk_overlap)
+
+
+@pytest.mark.parametrize("chunk_size, chunk_overlap", [(0, 0), (-1, 0), (10, -1), (10, 11)])
+def test_invalid_arguments_are_rejected(chunk_size, chunk_overlap):
+    for chunk in (get_chunks_of_text, _load_driving_bot_chunking().get_chunks_of_text):
+        with pytest.raises(ValueError):
+            chunk("some text", chunk_size, chunk_overlap)
+
+    stream = io.StringIO("some text")
+    with pytest.raises(ValueError):
+        next(iter_chunks_of_stream(stream, chunk_size, chunk_overlap))
+    assert stream.tell() == 0
+
+
+def test_ingest_endpoints_reject_invalid_arguments():
+    import main
+
+    client = TestClient(main.app)
+    assert client.post("/ingest", data={"text": "x", "chunk_size": 0}).status_code == 422
+    assert client.post("/ingest", data={"text": "x", "overlap": -1}).status_code == 422
+    response = client.post("/ingest", data={"text": "x", "chunk_size": 100, "overlap": 200})
+    assert response.status_code == 400
+    assert "overlap" in response.json()["detail"]
+    files = {"file": ("rules.txt", b"x")}
+    assert client.post("/ingest/file", files=files, data={"chunk_size": -5}).status_code == 422
+    assert client.post("/ingest/file", files=files, data={"chunk_size": 100, "overlap": 101}).status_code == 400
+
+
+@pytest.mark.parametrize("chunk_size, chunk_overlap", [(20, 0), (20, 5), (64, 16), (200, 50)])
+def test_stream_invariants_across_window_seams(chunk_size, chunk_overlap):
+    rng = random.Random(chunk_size * 1000 + chunk_overlap)
+    text = _numbered_text(rng, 10000)
+    chunks = list(iter_chunks_of_stream(io.StringIO(text), chunk_size, chunk_overlap, window_chunks=8))
+    # 8 chunks per window, so the text spans many seams.
+    assert len(text) > 5 * 8 * chunk_size
+
+    # Chunk starts never go backwards (a chunk may start where the previous one did).
+    spans, position = [], 0
+    for chunk in chunks:
+        assert 0 < len(chunk) <= chunk_size
+        assert chunk == chunk.strip()
+        start = text.find(chunk, position)
+        assert start != -1, chunk
+        spans.append((start, start + len(chunk)))
+        position = start
+
+    covered = bytearray(len(text))
+    for (start, end), (next_start, _) in zip(spans, spans[1:]):
+        assert max(0, end - next_start) <= chunk_overlap
+    for start, end in spans:
+        covered[start:end] = b"\x01" * (end - start)
+    assert all(covered[i] or text[i].isspace() for i in range(len(text)))
+
+
+def test_stream_reads_incrementally():
+    class CountingStream(io.StringIO):
+        largest_read = 0
+
+        def read(self, size=-1):
+            CountingStream.largest_read = max(CountingStream.largest_read, size)
+            return super().read(size)
+
+    text = _numbered_text(random.Random(4), 20000)
+    chunks = list(iter_chunks_of_stream(CountingStream(text), 100, 20, window_chunks=8))
+    assert len(chunks) > 1000
+    assert 0 < CountingStream.largest_read <= 8 * 100
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
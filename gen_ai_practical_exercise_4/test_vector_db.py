@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for migrating collections written with the legacy /api/embeddings
+endpoint (unnormalized vectors) to the unit-length /api/embed space.
+"""
+
+import numpy as np
+import pytest
+
+from embedding import EMBEDDING_KEY
+from vector_db import EMBEDDING_METADATA_KEY, get_or_create_collection, migrate_collections
+
+chromadb = pytest.importorskip("chromadb")
+
+
+@pytest.fixture
+def client(tmp_path):
+    return chromadb.PersistentClient(path=str(tmp_path / "vector-db"))
+
+
+def test_legacy_collection_is_normalized(client):
+    legacy = client.create_collection("Portugal")
+    # The relevant fact points the same way as the query, but has the larger norm.
+    legacy.add(ids=["fact-1", "fact-2"], documents=["relevant", "other"],
+               embeddings=[[12.0, 16.0, 0.0], [0.0, 6.0, 8.0]])
+    query = [0.6, 0.8, 0.0]
+    assert legacy.query(query_embeddings=[query], n_results=1)["ids"] == [["fact-2"]]
+
+    assert migrate_collections(client) == {"Portugal": 2}
+    migrated = client.get_collection("Portugal")
+    rows = migrated.get(include=["embeddings", "documents"])
+    assert np.linalg.norm(rows["embeddings"], axis=1) == pytest.approx([1.0, 1.0])
+    assert rows["documents"] == ["relevant", "other"]
+    assert migrated.metadata[EMBEDDING_METADATA_KEY] == EMBEDDING_KEY
+    assert migrated.query(query_embeddings=[query], n_results=1)["ids"] == [["fact-1"]]
+
+    assert migrate_collections(client) == {}
+
+
+def test_new_collections_are_marked(client):
+    collection = get_or_create_collection(client, "Reptiles")
+    collection.add(ids=["a"], documents=["a"], embeddings=[[0.6, 0.8, 0.0]])
+    assert migrate_collections(client) == {}
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -1,17 +1,154 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+from collections import deque
+from typing import NamedTuple
 import re
 
+# The chunker below (up to get_chunks_of_text) is duplicated in
+# classwork/driving_bot/modules/chunking.py; change both copies together.
+# test_text_processing.py checks that they produce the same chunks.
+
+# Separators tried in order by the recursive chunker, as in LangChain's
+# RecursiveCharacterTextSplitter; "" splits into single characters.
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")
+
+class TextChunk(NamedTuple):
+    page_content: str
+    start: int
+    end: int
+
+def _separator_spans(text: str, start: int, end: int, separator: str):
+    """Split text[start:end] before every occurrence of separator (kept at the start of the next piece)."""
+    if not separator:
+        for position in range(start, end):
+            yield position, position + 1
+        return
+    previous = start
+    position = text.find(separator, start, end)
+    while position != -1:
+        if position > previous:
+            yield previous, position
+        previous = position
+        position = text.find(separator, position + len(separator), end)
+    yield previous, end
+
+def _stripped_span(text: str, start: int, end: int):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+def _chunk_spans(text: str, start: int, end: int, separators, chunk_size: int, chunk_overlap: int):
+    separator, remaining = separators[-1], ()
+    for i, candidate in enumerate(separators):
+        if candidate == "":
+            separator = candidate
+            break
+        if text.find(candidate, start, end) != -1:
+            separator, remaining = candidate, separators[i + 1:]
+            break
+
+    current, total = deque(), 0
+    for split_start, split_end in _separator_spans(text, start, end, separator):
+        length = split_end - split_start
+        if length < chunk_size:
+            if current and total + length > chunk_size:
+                chunk = _stripped_span(text, current[0][0], current[-1][1])
+                if chunk[0] < chunk[1]:
+                    yield chunk
+                while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                    first_start, first_end = current.popleft()
+                    total -= first_end - first_start
+            current.append((split_start, split_end))
+            total += length
+            continue
+
+        if current:
+            chunk = _stripped_span(text, current[0][0], current[-1][1])
+            if chunk[0] < chunk[1]:
+                yield chunk
+            current.clear()
+            total = 0
+        if remaining:
+            yield from _chunk_spans(text, split_start, split_end, remaining, chunk_size, chunk_overlap)
+        else:
+            yield split_start, split_end
+
+    if current:
+        chunk = _stripped_span(text, current[0][0], current[-1][1])
+        if chunk[0] < chunk[1]:
+            yield chunk
+
+def check_chunk_arguments(chunk_size: int, chunk_overlap: int):
+    """Raise ValueError for the arguments LangChain's splitter rejects."""
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be > 0, got {chunk_size}")
+    if chunk_overlap < 0:
+        raise ValueError(f"chunk_overlap must be >= 0, got {chunk_overlap}")
+    if chunk_overlap > chunk_size:
+        raise ValueError(f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size}), should be smaller.")
+
+def iter_chunk_spans(text: str, chunk_size: int, chunk_overlap: int, separators=DEFAULT_SEPARATORS):
+    """
+    Yield the (start, end) offsets of the chunks of text.
+
+    Same chunk boundaries as LangChain's RecursiveCharacterTextSplitter with
+    default settings (recursive separators kept at the start of each piece,
+    whitespace stripped from every chunk), but computed on offsets into text,
+    so no intermediate strings are built.
+
+    Raises:
+        ValueError: If chunk_size is not positive or chunk_overlap is not
+            between 0 and chunk_size, like LangChain.
+    """
+    check_chunk_arguments(chunk_size, chunk_overlap)
+    return _chunk_spans(text, 0, len(text), tuple(separators), chunk_size, chunk_overlap)
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int):
+    """Chunk strings of text; see iter_chunk_spans."""
+    return [text[start:end] for start, end in iter_chunk_spans(text, chunk_size, chunk_overlap)]
+
 def get_chunks_of_text(text: str, chunk_size: int, chunk_overlap: int):
-    document = Document(page_content=text)
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap
-    )
+    """Chunks of text as TextChunk(page_content, start, end)."""
+    return [TextChunk(text[start:end], start, end) for start, end in iter_chunk_spans(text, chunk_size, chunk_overlap)]
+
+# Characters of lookahead kept in memory by iter_chunks_of_stream, in units of chunk_size.
+STREAM_WINDOW_CHUNKS = 64
+
+def iter_chunks_of_stream(stream, chunk_size: int, chunk_overlap: int, window_chunks: int = STREAM_WINDOW_CHUNKS):
+    """
+    Yield the chunks of a text stream, reading it incrementally.
+
+    Only a window of about window_chunks * chunk_size characters is held in
+    memory. Each window is split with iter_chunk_spans, like get_chunks_of_text;
+    chunks ending in its last 2 * chunk_size characters are held back and
+    re-split together with the following text. Chunks therefore respect the
+    same chunk_size and chunk_overlap, and match get_chunks_of_text except
+    for a few chunks around each window seam.
+    """
+    check_chunk_arguments(chunk_size, chunk_overlap)
+    window = max(window_chunks, 8) * chunk_size
+    buffer = ""
+    while True:
+        block = stream.read(window - len(buffer))
+        buffer += block
+        if not block:
+            yield from split_text(buffer, chunk_size, chunk_overlap)
+            return
 
-    chunks = splitter.split_documents(documents=[document])
+        safe_end = len(buffer) - 2 * chunk_size
+        carry_from = len(buffer)
+        for start, end in iter_chunk_spans(buffer, chunk_size, chunk_overlap):
+            if end > safe_end:
+                carry_from = start
+                break
+            yield buffer[start:end]
+        if carry_from == 0:
+            window *= 2
+        buffer = buffer[carry_from:]
 
-    return chunks
+def estimate_tokens(text: str) -> int:
+    """Cheap token count estimate (about four characters per token for English-like text)."""
+    return (len(text) + 3) // 4
 
 def sanitize_topic(topic: str) -> str:
     topic = topic.replace(" ", "_")
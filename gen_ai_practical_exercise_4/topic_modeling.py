@@ -1,7 +1,22 @@
-import ollama
+from collections import OrderedDict
+import numpy as np
+from concurrency import limit, ollama_async_client
+from embedding_cache import text_hash
+from routing import collection_router
+from text_processing import estimate_tokens
 
-def get_topic(text: str) -> str:
-    prompt = f"""Determine the single most relevant topic for the following text. 
+TOPIC_MODEL = "gemma3"
+# Minimum cosine similarity between a text and a collection centroid for
+# the text to be assigned to that collection without asking the LLM.
+TOPIC_SIMILARITY_THRESHOLD = 0.6
+TOPIC_CACHE_SIZE = 4096
+# Estimated tokens of document text sent to the LLM for topic detection;
+# None sends the whole text.
+TOPIC_TOKEN_BUDGET = 1500
+TOPIC_SAMPLE_SEPARATOR = "\n[...]\n"
+
+def _topic_prompt(text: str) -> str:
+    return f"""Determine the single most relevant topic for the following text. 
     The topic should be a single word or a short phrase. 
     Examples: 'Science', 'History', 'Technology', 'Art', 'Sports'.
 
@@ -9,10 +24,120 @@ def get_topic(text: str) -> str:
 
     Topic:"""
 
+def get_topic(text: str) -> str:
+    import ollama
     response = ollama.generate(
-        model="gemma3",
-        prompt=prompt,
+        model=TOPIC_MODEL,
+        prompt=_topic_prompt(text),
         stream=False
     )
     topic = response.get('response', 'unknown_topic').strip()
     return topic
+
+def build_topic_sample(chunks_text, embeddings, token_budget: int = TOPIC_TOKEN_BUDGET) -> str:
+    """
+    Representative excerpt of a chunked document that fits in token_budget.
+
+    Documents within the budget are returned whole. Otherwise the first and
+    last chunks are always kept, then the chunks whose embeddings are closest
+    to the document centroid are added while they fit. The selected chunks
+    are joined in document order.
+    """
+    full_text = "\n".join(chunks_text)
+    if token_budget is None or estimate_tokens(full_text) <= token_budget:
+        return full_text
+
+    vectors = np.asarray(embeddings, dtype=np.float64)
+    centroid = vectors.mean(axis=0)
+    similarities = vectors @ centroid / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(centroid) + 1e-12)
+    candidates = [0, len(chunks_text) - 1] + [int(i) for i in np.argsort(-similarities)]
+
+    selected, used = set(), 0
+    for index in candidates:
+        cost = estimate_tokens(chunks_text[index])
+        if index in selected or used + cost > token_budget:
+            continue
+        selected.add(index)
+        used += cost
+    return TOPIC_SAMPLE_SEPARATOR.join(chunks_text[i] for i in sorted(selected))
+
+async def get_topic_async(text: str) -> str:
+    async with limit("ollama"):
+        response = await ollama_async_client().generate(
+            model=TOPIC_MODEL,
+            prompt=_topic_prompt(text),
+            stream=False
+        )
+    topic = response.get('response', 'unknown_topic').strip()
+    return topic
+
+
+class TopicResolver:
+    """
+    Resolves the topic of a text without calling the LLM whenever it can.
+
+    Three tiers are tried in order:
+      1. a memo cache of previously resolved texts, keyed by text hash;
+      2. cosine similarity between the text's embedding and the centroid of
+         every known collection, accepted when it reaches the threshold
+         (the topic is then that collection's name);
+      3. get_topic_async, i.e. a gemma3 call.
+
+    Centroids come from the collection routing index (see routing.py).
+    """
+
+    def __init__(self, threshold: float = TOPIC_SIMILARITY_THRESHOLD, cache_size: int = TOPIC_CACHE_SIZE,
+                 router=collection_router):
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.router = router
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.centroid_hits = 0
+        self.llm_calls = 0
+
+    def classify(self, vector):
+        """Return (collection name, cosine similarity) of the closest centroid, or (None, 0.0)."""
+        ranked = self.router.rank(vector, 1)
+        return ranked[0] if ranked else (None, 0.0)
+
+    async def resolve_async(self, text: str, embedding=None, sample: str = None) -> str:
+        """
+        Topic for text.
+
+        Args:
+            embedding: Embedding of the text (or a representative one); enables the centroid tier.
+            sample: Shorter excerpt sent to the LLM instead of the full text (see build_topic_sample).
+        """
+        key = text_hash(text)
+        topic = self._cache.get(key)
+        if topic is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return topic
+
+        name, similarity = self.classify(embedding) if embedding is not None else (None, 0.0)
+        if name is not None and similarity >= self.threshold:
+            self.centroid_hits += 1
+            topic = name
+        else:
+            self.llm_calls += 1
+            topic = await get_topic_async(sample if sample is not None else text)
+
+        self._cache[key] = topic
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return topic
+
+    def stats(self):
+        resolved = self.cache_hits + self.centroid_hits + self.llm_calls
+        return {
+            "cache_hits": self.cache_hits,
+            "centroid_hits": self.centroid_hits,
+            "llm_calls": self.llm_calls,
+            "llm_avoided_rate": (self.cache_hits + self.centroid_hits) / resolved if resolved else 0.0,
+            "collections": len(self.router),
+        }
+
+
+topic_resolver = TopicResolver()
@@ -1,29 +1,139 @@
-import chromadb
-from embedding import get_embedding, get_embeddings
+import hashlib
+import time
+import numpy as np
+from embedding import EMBEDDING_KEY, get_embedding, get_embeddings
+
+UPSERT_BATCH_SIZE = 256
+# Collection metadata entry naming where the stored vectors come from (EMBEDDING_KEY).
+EMBEDDING_METADATA_KEY = "embedding"
 
 def init_chroma():
+    import chromadb
     client = chromadb.PersistentClient(path="./vector-db")
     return client
 
 def get_or_create_collection(client, topic):
-    collection = client.get_or_create_collection(topic)
+    # The metadata only applies when the collection is created.
+    collection = client.get_or_create_collection(topic, metadata={EMBEDDING_METADATA_KEY: EMBEDDING_KEY})
     return collection
 
-def add_to_collection(collection, chunks, metadata):
+def normalize_collection_embeddings(collection, batch_size: int = UPSERT_BATCH_SIZE):
+    """
+    Scale the stored embeddings of a collection to unit length, unless it is already marked as EMBEDDING_KEY.
+
+    Collections written through the legacy /api/embeddings endpoint hold
+    unnormalized vectors of the same model. Under Chroma's default L2
+    distance, unit-length /api/embed queries against them are ranked by
+    vector norm rather than meaning, and their distances cannot be merged
+    with other collections'. Normalizing keeps each vector's direction, so
+    nothing has to be re-embedded.
+
+    Returns:
+        Number of rows rescaled.
+    """
+    metadata = collection.metadata or {}
+    if metadata.get(EMBEDDING_METADATA_KEY) == EMBEDDING_KEY:
+        return 0
+    ids = collection.get(include=[])["ids"]
+    for start in range(0, len(ids), batch_size):
+        rows = collection.get(ids=ids[start:start + batch_size], include=["embeddings"])
+        vectors = np.asarray(rows["embeddings"], dtype=np.float64)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        collection.update(ids=rows["ids"], embeddings=vectors.tolist())
+    # hnsw:* settings are fixed at creation and may not be passed to modify().
+    kept = {key: value for key, value in metadata.items() if not key.startswith("hnsw:")}
+    collection.modify(metadata={**kept, EMBEDDING_METADATA_KEY: EMBEDDING_KEY})
+    return len(ids)
+
+def migrate_collections(client):
+    """normalize_collection_embeddings for every collection; returns {name: rows rescaled} for those that needed it."""
+    migrated = {}
+    for collection in client.list_collections():
+        if (collection.metadata or {}).get(EMBEDDING_METADATA_KEY) != EMBEDDING_KEY:
+            migrated[collection.name] = normalize_collection_embeddings(collection)
+    return migrated
+
+def get_document_id(chunks_text):
+    return hashlib.sha256("\x1e".join(chunks_text).encode("utf-8")).hexdigest()[:16]
+
+def get_chunk_id(document_id, index):
+    return f"{document_id}-{index:06d}"
+
+def add_to_collection(collection, chunks, metadata, document_id=None, batch_size: int = UPSERT_BATCH_SIZE):
+    """
+    Embed the chunks of one document and upsert them in batches of at most batch_size rows.
+
+    Chunk ids are derived from the document id (by default a hash of the
+    document's chunks) and the chunk position, so re-ingesting a document
+    replaces its own chunks and never those of another document.
+
+    Returns:
+        One dict per upsert call with the batch number, row count and seconds taken.
+    """
     chunks_text = [chunk.page_content for chunk in chunks]
     embedding_collection = get_embeddings(chunks_text)
-    for i in range(0, len(embedding_collection)):
-        collection.upsert(documents=chunks_text[i],
-                         ids=[f"fact-{i+1}"],
-                         metadatas=[metadata],
-                         embeddings = [embedding_collection[i].embedding])
+    return upsert_chunks(collection, chunks_text, embedding_collection, metadata, document_id, batch_size)
+
+def upsert_chunks(collection, chunks_text, embedding_collection, metadata, document_id=None,
+                  batch_size: int = UPSERT_BATCH_SIZE, start_index: int = 0):
+    """
+    Upsert already embedded chunks; see add_to_collection.
+
+    start_index is the position of the first chunk within its document, for
+    documents that are written a part at a time.
+    """
+    if document_id is None:
+        document_id = get_document_id(chunks_text)
+    indexes = range(start_index, start_index + len(chunks_text))
+    return upsert_chunks_with_ids(
+        collection,
+        [get_chunk_id(document_id, i) for i in indexes],
+        chunks_text,
+        embedding_collection,
+        [{**(metadata or {}), "document_id": document_id, "chunk_index": i} for i in indexes],
+        batch_size,
+    )
+
+def upsert_chunks_with_ids(collection, ids, chunks_text, embedding_collection, metadatas,
+                           batch_size: int = UPSERT_BATCH_SIZE):
+    """Upsert chunks under explicit ids, metadatas and embeddings, batch_size rows per call."""
+    batches = []
+    for start in range(0, len(chunks_text), batch_size):
+        end = min(start + batch_size, len(chunks_text))
+        started = time.perf_counter()
+        collection.upsert(documents=chunks_text[start:end],
+                          ids=ids[start:end],
+                          metadatas=metadatas[start:end],
+                          embeddings=embedding_collection[start:end])
+        batches.append({
+            "batch": len(batches) + 1,
+            "rows": end - start,
+            "seconds": round(time.perf_counter() - started, 4),
+        })
+    return batches
+
+def update_chunk_metadata(collection, ids, metadatas, batch_size: int = UPSERT_BATCH_SIZE):
+    """Replace the metadata of existing chunks without touching their text or embeddings."""
+    for start in range(0, len(ids), batch_size):
+        collection.update(ids=ids[start:start + batch_size], metadatas=metadatas[start:start + batch_size])
+
+def delete_chunks(collection, ids):
+    """Delete chunks by id, returning the embeddings they had (to take them out of the routing centroid)."""
+    if not ids:
+        return []
+    rows = collection.get(ids=ids, include=["embeddings"])
+    collection.delete(ids=ids)
+    return rows["embeddings"] if rows["embeddings"] is not None else []
 
 def get_collection(client, topic):
     return client.get_collection(topic)
 
 def query_collection(collection, question):
     question_embedding = get_embedding(question)
-    results = collection.query(query_embeddings=[question_embedding.embedding], n_results=1)
+    return query_collection_by_embedding(collection, question_embedding.embedding)
+
+def query_collection_by_embedding(collection, question_embedding, n_results: int = 1, where=None):
+    results = collection.query(query_embeddings=[question_embedding], n_results=n_results, where=where or None)
     return results
 
 def list_collections(client):